@@ -1,7 +1,10 @@
 """Project proposal and initialization pipeline."""
 
 import argparse
+import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 from swe_play.propose.propose_projects import propose_projects
 from swe_play.propose.propose_tasks import generate_unit_tests, propose_tasks
@@ -12,6 +15,9 @@ def create_project_pipeline(
     model: str = "claude-sonnet-4-20250514",
     output_folder: str = "generated",
     docker: bool = False,
+    parallel: bool = False,
+    max_workers: int = 8,
+    use_cache: bool = False,
 ) -> dict[str, str]:
     """Complete pipeline to propose and initialize a new project.
 
@@ -22,6 +28,13 @@ def create_project_pipeline(
                (default: generated)
         docker: Whether to create a Docker image for the project
                (default: False)
+        parallel: Whether to build the Docker image while generating the unit tests
+               documentation. The documentation is moved into the project once the image
+               is built, so the image is the same as when run in sequence (default: False)
+        max_workers: The maximum number of concurrent LLM calls for unit tests
+               documentation generation (default: 8)
+        use_cache: Whether to reuse the LLM responses of identical earlier requests
+               (default: False)
 
     Returns:
         Dictionary containing project details:
@@ -37,7 +50,7 @@ def create_project_pipeline(
 
     # Step 1: Propose project
     print("Step 1: Proposing project...")
-    project = propose_projects(num_projects=1, model=model)
+    project = propose_projects(num_projects=1, model=model, use_cache=use_cache)
     project_description = project[0]["project_description"]
     repo_name = project[0]["repo_name"]
     programming_language = project[0]["programming_language"]
@@ -49,7 +62,7 @@ def create_project_pipeline(
 
     # Step 2: Propose tasks
     print("Step 2: Proposing tasks...")
-    tasks = propose_tasks(project_description, constraints, model=model)
+    tasks = propose_tasks(project_description, constraints, model=model, use_cache=use_cache)
     print("Tasks proposed successfully.")
     print("")
 
@@ -66,18 +79,54 @@ def create_project_pipeline(
     print(f"Project initialized at: {project_path}")
     print("")
 
-    # Step 3.5 Create Docker image for the project
-    if docker:
-        print("Step 3.5: Creating Docker image for the project...")
-        image_tag = create_docker_image(project_path=project_path)
+    # Steps 3.5 and 4 can overlap, as long as the Docker build context does not change under
+    # the build. The documentation is therefore written outside the project and only moved to
+    # tests/ once the image is built, leaving the build the same tree as when run in sequence
+    if docker and parallel:
+        print("Steps 3.5 and 4: Creating Docker image and generating unit tests documentation...")
+        unit_tests_dir = Path(project_path) / "tests"
+        # Next to the project, so it is moved within the same filesystem
+        staging_dir = Path(project_path).parent / f".{Path(project_path).name}_unit_tests"
+        try:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                docker_future = executor.submit(create_docker_image, project_path=project_path)
+                unit_tests_future = executor.submit(
+                    generate_unit_tests,
+                    project_path=project_path,
+                    model=model,
+                    max_workers=max_workers,
+                    use_cache=use_cache,
+                    output_dir=str(staging_dir),
+                )
+                unit_tests_future.result()
+                image_tag = docker_future.result()
+
+            if unit_tests_dir.exists():
+                shutil.rmtree(unit_tests_dir)
+            shutil.move(staging_dir, unit_tests_dir)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
         print(f"Docker image created successfully at: {image_tag}")
+        print("Unit tests documentation generated successfully.")
+        print("")
+    else:
+        # Step 3.5 Create Docker image for the project
+        if docker:
+            print("Step 3.5: Creating Docker image for the project...")
+            image_tag = create_docker_image(project_path=project_path)
+            print(f"Docker image created successfully at: {image_tag}")
+            print("")
+
+        # Step 4: Generate unit tests documentation
+        print("Step 4: Generating unit tests documentation...")
+        generate_unit_tests(
+            project_path=project_path,
+            model=model,
+            max_workers=max_workers,
+            use_cache=use_cache,
+        )
+        print("Unit tests documentation generated successfully.")
         print("")
-
-    # Step 4: Generate unit tests documentation
-    print("Step 4: Generating unit tests documentation...")
-    generate_unit_tests(project_path=project_path, model=model)
-    print("Unit tests documentation generated successfully.")
-    print("")
 
     return {
         "project_description": project_description,
@@ -96,6 +145,7 @@ Examples:
   python -m swe_play.propose.pipeline                                # Default settings
   python -m swe_play.propose.pipeline --model claude-sonnet-4-20250514
   python -m swe_play.propose.pipeline --output <folder>              # Custom output folder
+  python -m swe_play.propose.pipeline --docker True --parallel       # Overlap Docker build
         """,
     )
 
@@ -120,12 +170,36 @@ Examples:
         help="Whether to create a Docker image for the project (default: False)",
     )
 
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent LLM calls for unit tests documentation (default: 8)",
+    )
+
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="Reuse the LLM responses of identical earlier requests instead of calling the LLM",
+    )
+
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Build the Docker image while generating the unit tests documentation",
+    )
+
     args = parser.parse_args()
 
     try:
         print("🚀 Starting project creation pipeline...\n")
         result = create_project_pipeline(
-            model=args.model, output_folder=args.output, docker=args.docker
+            model=args.model,
+            output_folder=args.output,
+            docker=args.docker,
+            parallel=args.parallel,
+            max_workers=args.max_workers,
+            use_cache=args.use_cache,
         )
 
         print("\n✅ Pipeline completed successfully!")
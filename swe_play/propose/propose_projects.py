@@ -1,19 +1,91 @@
 """Project Proposal pipeline."""
 
 import argparse
-import json
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from swe_play.utils.llm_client import create_llm_client
-from swe_play.utils.prompt_retriever import PromptRetriever
+from swe_play.utils.json_utils import dump_json
+from swe_play.utils.llm_cache import cached_system_completion
+from swe_play.utils.llm_client import get_llm_client
+from swe_play.utils.prompt_retriever import get_prompt_retriever
+
+# Maps the tags of a project block in the LLM response to the project fields
+PROJECT_FIELDS = {
+    "proposed_project": "project_description",
+    "repo_name": "repo_name",
+    "programming_language": "programming_language",
+    "constraints": "constraints",
+}
+
+# Matches any of the tags above, so the response is scanned in a single pass
+PROJECT_TAG_PATTERN = re.compile(rf"<({'|'.join(PROJECT_FIELDS)})>(.*?)</\1>", re.DOTALL)
+
+
+def parse_projects(response: str) -> list[dict[str, str]]:
+    """Parse the proposed projects out of an LLM response.
+
+    Args:
+        response: The LLM response to the propose-projects prompts.
+
+    Returns:
+        The complete projects in the response, in the same format as `propose_projects`.
+    """
+    # Every project block starts with its <proposed_project> tag
+    blocks: list[dict[str, str]] = []
+    for match in PROJECT_TAG_PATTERN.finditer(response):
+        tag, value = match.group(1), match.group(2).strip()
+        if tag == "proposed_project":
+            blocks.append({})
+        if blocks:
+            blocks[-1][PROJECT_FIELDS[tag]] = value
+
+    # Drop incomplete blocks, e.g. a truncated last project
+    return [
+        {field: block[field] for field in PROJECT_FIELDS.values()}
+        for block in blocks
+        if len(block) == len(PROJECT_FIELDS)
+    ]
+
+
+def save_projects(
+    projects: list[dict[str, str]], output_folder: str | None = None
+) -> list[dict[str, str]]:
+    """Drop the projects reusing the repository name of an earlier one, then save the rest.
+
+    Projects are saved under their repository name, so a duplicate name would silently
+    overwrite the file of the earlier project.
+
+    Args:
+        projects: The proposed projects, in the same format as `propose_projects`.
+        output_folder: The folder to save the projects as JSON files. If None, nothing is saved.
+
+    Returns:
+        The projects with distinct repository names, in their original order.
+    """
+    unique_projects: dict[str, dict[str, str]] = {}
+    for project in projects:
+        if project["repo_name"] in unique_projects:
+            print(f"⚠️  Dropping duplicate project with repository name {project['repo_name']}.")
+        else:
+            unique_projects[project["repo_name"]] = project
+
+    if output_folder is not None:
+        output_dir = Path(output_folder)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for project in unique_projects.values():
+            dump_json(project, output_dir / f"{project['repo_name']}.json")
+
+    return list(unique_projects.values())
 
 
 def propose_projects(
     model: str = "claude-sonnet-4-20250514",
     num_projects: int = 1,
     output_folder: str | None = None,
+    use_cache: bool = False,
+    batch: bool = False,
 ) -> list[dict[str, str]]:
     """Propose diverse projects using the LLM.
 
@@ -21,9 +93,14 @@ def propose_projects(
         model: The LLM model to use for project proposal.
         num_projects: The number of projects to propose.
         output_folder: The folder to save the proposed projects.
+        use_cache: Whether to reuse the response of an identical earlier request. Off by
+            default, since a fresh sample is usually wanted for project proposal.
+        batch: Whether to propose each project in its own request, submitted together
+            through the Batch API. Cheaper and avoids truncated long responses, but may
+            take hours to complete. The response cache is not used in this mode.
 
     Returns:
-        A list of dictionaries, each containing:
+        A list of dictionaries with distinct repository names, each containing:
         - project_description: Description of the project
         - repo_name: Repository name
         - programming_language: Programming language
@@ -32,51 +109,82 @@ def propose_projects(
     Raises:
         Exception: If project proposal fails or response format is invalid.
     """
-    llm_client = create_llm_client(model=model)
-    prompt_retriever = PromptRetriever()
+    llm_client = get_llm_client(model)
+    prompt_retriever = get_prompt_retriever()
 
     system_prompt = prompt_retriever.get_prompt("propose-projects-system")
-    user_prompt = prompt_retriever.get_prompt("propose-projects-user", num_projects=num_projects)
 
-    print(f"Calling LLM to propose {num_projects} diverse projects...")
-    response = llm_client.system_completion(
-        system_prompt=system_prompt, user_prompt=user_prompt, temperature=0.7
-    )
+    if batch:
+        user_prompt = prompt_retriever.get_prompt("propose-projects-user", num_projects=1)
+        print(f"Submitting a batch of {num_projects} project proposal requests...")
+        responses = llm_client.batch_system_completion(
+            [(system_prompt, user_prompt)] * num_projects, temperature=0.7
+        )
+        projects = [project for response in responses for project in parse_projects(response)]
+    else:
+        user_prompt = prompt_retriever.get_prompt(
+            "propose-projects-user", num_projects=num_projects
+        )
+        print(f"Calling LLM to propose {num_projects} diverse projects...")
+        response = cached_system_completion(
+            llm_client, system_prompt, user_prompt, temperature=0.7, use_cache=use_cache
+        )
+        projects = parse_projects(response)
 
-    # Parse the response to extract all projects
-    projects = []
+    return save_projects(projects, output_folder)
 
-    # Find all project blocks in the response
-    project_pattern = (
-        r"Project \d+:\s*<proposed_project>(.*?)</proposed_project>\s*"
-        r"<repo_name>(.*?)</repo_name>\s*<programming_language>(.*?)</programming_language>\s*"
-        r"<constraints>(.*?)</constraints>"
-    )
-    matches = re.findall(project_pattern, response, re.DOTALL)
-
-    for match in matches:
-        project_description = match[0].strip()
-        repo_name = match[1].strip()
-        programming_language = match[2].strip()
-        constraints = match[3].strip()
-
-        projects.append(
-            {
-                "project_description": project_description,
-                "repo_name": repo_name,
-                "programming_language": programming_language,
-                "constraints": constraints,
-            }
+
+def propose_projects_batch(
+    model: str = "claude-sonnet-4-20250514",
+    num_requests: int = 1,
+    num_projects: int = 1,
+    output_folder: str | None = None,
+    max_workers: int = 4,
+    use_cache: bool = False,
+) -> list[dict[str, str]]:
+    """Propose projects with several concurrent LLM calls.
+
+    Each request proposes `num_projects` projects, so the batch yields up to
+    `num_requests * num_projects` projects for roughly the latency of a single call.
+
+    Args:
+        model: The LLM model to use for project proposal.
+        num_requests: The number of LLM calls to issue.
+        num_projects: The number of projects to propose in each LLM call.
+        output_folder: The folder to save the proposed projects.
+        max_workers: The maximum number of concurrent LLM calls, to respect rate limits.
+        use_cache: Whether to reuse the responses of identical earlier requests. All requests
+            of a batch are identical and would return the same projects from the cache, so
+            only a single request is made when enabled.
+
+    Returns:
+        The proposed projects of all requests with distinct repository names, in the same
+        format as `propose_projects`.
+
+    Raises:
+        Exception: If any of the project proposals fails.
+    """
+    if use_cache and num_requests > 1:
+        print(
+            f"⚠️  Cached requests would all return the same projects, making 1 request "
+            f"instead of {num_requests}."
         )
+        num_requests = 1
 
-    if output_folder is not None:
-        if not Path(output_folder).exists():
-            Path(output_folder).mkdir(parents=True, exist_ok=True)
-        for project in projects:
-            with open(Path(output_folder) / f"{project['repo_name']}.json", "w") as f:
-                json.dump(project, f)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        batches = list(
+            executor.map(
+                lambda _: propose_projects(
+                    model=model,
+                    num_projects=num_projects,
+                    use_cache=use_cache,
+                ),
+                range(num_requests),
+            )
+        )
 
-    return projects
+    # Saved together, so projects of different requests sharing a name are also deduplicated
+    return save_projects([project for batch in batches for project in batch], output_folder)
 
 
 def main() -> None:
@@ -89,6 +197,8 @@ Examples:
   python -m swe_play.propose.propose_projects                              # Default settings
   python -m swe_play.propose.propose_projects --model claude-sonnet-4-20250514
   python -m swe_play.propose.propose_projects --output projects            # Custom folder
+  python -m swe_play.propose.propose_projects --num-requests 8             # Concurrent calls
+  python -m swe_play.propose.propose_projects --num-projects 20 --batch    # Batch API
         """,
     )
 
@@ -99,6 +209,32 @@ Examples:
         help="Number of projects to propose (default: 1)",
     )
 
+    parser.add_argument(
+        "--num-requests",
+        type=int,
+        default=1,
+        help="Number of concurrent LLM calls, each proposing --num-projects projects (default: 1)",
+    )
+
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=4,
+        help="Maximum number of LLM calls running at the same time (default: 4)",
+    )
+
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Propose each project in its own request through the Batch API (slow but cheaper)",
+    )
+
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="Reuse the LLM response of an identical earlier request instead of calling the LLM",
+    )
+
     parser.add_argument(
         "--model",
         type=str,
@@ -117,9 +253,22 @@ Examples:
 
     try:
         print("🚀 Starting projects proposal pipeline...\n")
-        projects = propose_projects(
-            model=args.model, num_projects=args.num_projects, output_folder=args.output
-        )
+        if args.batch:
+            projects = propose_projects(
+                model=args.model,
+                num_projects=args.num_projects,
+                output_folder=args.output,
+                batch=True,
+            )
+        else:
+            projects = propose_projects_batch(
+                model=args.model,
+                num_requests=args.num_requests,
+                num_projects=args.num_projects,
+                output_folder=args.output,
+                max_workers=args.max_workers,
+                use_cache=args.use_cache,
+            )
 
         print(f"✅ Successfully proposed {len(projects)} diverse projects!")
         if args.output is not None:
@@ -1,18 +1,22 @@
 """Task proposal pipeline."""
 
 import argparse
-import json
-import re
 import shutil
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from swe_play.utils.llm_client import create_llm_client
-from swe_play.utils.prompt_retriever import PromptRetriever
+from swe_play.utils.json_utils import dump_json, load_json
+from swe_play.utils.llm_cache import cached_system_completion
+from swe_play.utils.llm_client import get_llm_client
+from swe_play.utils.prompt_retriever import get_prompt_retriever
 
 
 def propose_tasks(
-    project_description: str, constraints: str, model: str = "neulab/claude-sonnet-4-20250514"
+    project_description: str,
+    constraints: str,
+    model: str = "neulab/claude-sonnet-4-20250514",
+    use_cache: bool = False,
 ) -> str:
     """Propose tasks for the project by calling OpenHands.
 
@@ -20,6 +24,7 @@ def propose_tasks(
         project_description: Description of the project to work on
         constraints: Constraints for the project
         model: The LLM model to use for task proposal
+        use_cache: Whether to reuse the responses of identical earlier requests
 
     Returns:
         Proposed tasks in markdown format
@@ -27,8 +32,8 @@ def propose_tasks(
     Raises:
         Exception: If task proposal fails.
     """
-    llm_client = create_llm_client(model=model)
-    prompt_retriever = PromptRetriever()
+    llm_client = get_llm_client(model)
+    prompt_retriever = get_prompt_retriever()
 
     system_prompt = prompt_retriever.get_prompt("propose-tasks-system")
     user_prompt = prompt_retriever.get_prompt(
@@ -38,8 +43,8 @@ def propose_tasks(
     )
 
     print("Calling LLM to propose tasks for the project...")
-    response = llm_client.system_completion(
-        system_prompt=system_prompt, user_prompt=user_prompt, temperature=0.7
+    response = cached_system_completion(
+        llm_client, system_prompt, user_prompt, temperature=0.7, use_cache=use_cache
     )
 
     # Check if we have a complete response with both opening and closing tags
@@ -53,34 +58,59 @@ def propose_tasks(
     # Two times should be enough, and more typically mean error
     if has_opening_tag and not has_closing_tag:
         print("Response appears to be truncated, asking model to continue...")
-        continue_user_prompt = prompt_retriever.get_prompt(
-            "propose-tasks-user-continue",
-            project_description=project_description,
-            constraints=constraints,
-            response=response,
-        )
-        continuation_response = llm_client.system_completion(
-            system_prompt=system_prompt, user_prompt=continue_user_prompt, temperature=0.7
-        )
-        response += continuation_response
-        if not has_closing_tag:
+        if "claude" in model.lower():
+            # Claude resumes a prefilled answer directly, so the truncated response is sent
+            # once as the start of the answer rather than quoted inside a new prompt
+            response = response.rstrip()
+            response += llm_client.continue_completion(
+                system_prompt, user_prompt, response, temperature=0.7
+            )
+        else:
+            continue_user_prompt = prompt_retriever.get_prompt(
+                "propose-tasks-user-continue",
+                project_description=project_description,
+                constraints=constraints,
+                response=response,
+            )
+            response += cached_system_completion(
+                llm_client,
+                system_prompt,
+                continue_user_prompt,
+                temperature=0.7,
+                use_cache=use_cache,
+            )
+        if "</tasks>" not in response:
             raise Exception("Warning: Could not get complete response even after continuation")
 
-    tasks_match = re.search(r"<tasks>(.*?)</tasks>", response, re.DOTALL)
-    if not tasks_match:
+    # Plain substring search is enough to cut out the first <tasks>...</tasks> block
+    tasks_start = response.find("<tasks>")
+    tasks_end = response.find("</tasks>", tasks_start + len("<tasks>")) if tasks_start != -1 else -1
+    if tasks_end == -1:
         raise Exception(f"Invalid response format from LLM. Expected <tasks> tag. Got: {response}")
 
-    tasks = tasks_match.group(1).strip()
+    tasks = response[tasks_start + len("<tasks>") : tasks_end].strip()
     return tasks
 
 
-def generate_unit_tests(project_path: str, model: str = "neulab/claude-sonnet-4-20250514") -> None:
+def generate_unit_tests(
+    project_path: str,
+    model: str = "neulab/claude-sonnet-4-20250514",
+    max_workers: int = 8,
+    use_cache: bool = False,
+    output_dir: str | None = None,
+) -> None:
     """Generate unit tests documentation for the project.
 
-    Uses OpenHands to create documentation in the initialized repo.
+    Uses the LLM to create documentation in the initialized repo. The documentation of
+    different tasks is generated concurrently.
 
     Args:
         project_path: The path to the project to create unit tests documentation for
+        model: The LLM model to use for unit tests documentation generation
+        max_workers: The maximum number of concurrent LLM calls
+        use_cache: Whether to reuse the responses of identical earlier requests
+        output_dir: The directory to write the documentation to, replacing its content. If
+            None, the tests folder of the project is used
 
     Returns:
         None
@@ -88,13 +118,13 @@ def generate_unit_tests(project_path: str, model: str = "neulab/claude-sonnet-4-
     Raises:
         Exception: If unit tests documentation generation fails.
     """
-    unit_tests_dir = Path(project_path) / "tests"
+    unit_tests_dir = Path(output_dir) if output_dir is not None else Path(project_path) / "tests"
     if unit_tests_dir.exists():
         shutil.rmtree(unit_tests_dir)
     unit_tests_dir.mkdir(parents=True, exist_ok=True)
 
-    task = json.load(open(Path(project_path) / "tasks.json"))
-    tasks_prompt = open(Path(project_path) / "tasks.md").read()
+    task = load_json(Path(project_path) / "tasks.json")
+    tasks_prompt = (Path(project_path) / "tasks.md").read_text(encoding="utf-8")
     unit_tests_by_task = {}
     project_description = task.get("project_description")
 
@@ -110,23 +140,15 @@ def generate_unit_tests(project_path: str, model: str = "neulab/claude-sonnet-4-
                 # Only process tasks that have actual tests
                 if code_tests or visual_tests:
                     # Combine all tests for this task X.Y.Z
-                    all_tests_for_task = []
-                    for test in code_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "code",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-                    for test in visual_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "visual",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
+                    all_tests_for_task = [
+                        {
+                            "type": test_type,
+                            "name": test.get("name"),
+                            "description": test.get("description"),
+                        }
+                        for test_type, tests in (("code", code_tests), ("visual", visual_tests))
+                        for test in tests
+                    ]
 
                     unit_tests_by_task[task_number] = {
                         "task_number": task_number,
@@ -138,35 +160,63 @@ def generate_unit_tests(project_path: str, model: str = "neulab/claude-sonnet-4-
                         "total_tests": len(all_tests_for_task),
                     }
 
-    # Then iterate over each task to generate unit tests documentation
-    previous_unit_tests = ""
+    # Each task is prompted with the test summaries of all tasks before it. These summaries
+    # only depend on tasks.json, so build them up front and let the LLM calls run concurrently
+    unit_test_prompts: dict[str, str] = {}
+    previous_unit_tests_for: dict[str, str] = {}
+    previous_unit_tests_parts: list[str] = []
     for task_number, task_data in unit_tests_by_task.items():
-        # Format the unit test prompt for the task
-        print(f"Generating unit test documentation for task {task_number}...")
-        unit_test_prompt = f"Task {task_number}: {task_data['total_tests']} total tests\n"
-        for test in task_data["all_tests"]:
-            unit_test_prompt += f"  - {test['type']}: {test['name']}\n"
-
-        llm_client = create_llm_client(model=model)
-        prompt_retriever = PromptRetriever()
+        unit_test_prompt_parts = [f"Task {task_number}: {task_data['total_tests']} total tests\n"]
+        unit_test_prompt_parts.extend(
+            f"  - {test['type']}: {test['name']}\n" for test in task_data["all_tests"]
+        )
+        unit_test_prompt = "".join(unit_test_prompt_parts)
+        unit_test_prompts[task_number] = unit_test_prompt
+        previous_unit_tests_for[task_number] = "".join(previous_unit_tests_parts)
+        previous_unit_tests_parts.append(f"{unit_test_prompt}\n\n")
+
+    # The client and the system prompt are shared by all tasks
+    llm_client = get_llm_client(model)
+    prompt_retriever = get_prompt_retriever()
+    system_prompt = prompt_retriever.get_prompt("unit-test-system")
+    # Every user prompt starts with the project context, which is cached by the provider
+    context_prompt = prompt_retriever.get_prompt(
+        "unit-test-user-context",
+        project_description=project_description,
+        tasks_prompt=tasks_prompt,
+    )
 
-        system_prompt = prompt_retriever.get_prompt("unit-test-system")
+    def generate_for_task(task_number: str) -> None:
+        """Generate the unit tests documentation of a single task."""
+        print(f"Generating unit test documentation for task {task_number}...")
         user_prompt = prompt_retriever.get_prompt(
             "unit-test-user",
             project_description=project_description,
             tasks_prompt=tasks_prompt,
-            previous_unit_tests=previous_unit_tests,
-            unit_test_prompt=unit_test_prompt,
+            previous_unit_tests=previous_unit_tests_for[task_number],
+            unit_test_prompt=unit_test_prompts[task_number],
         )
 
         print("Calling LLM to generate unit tests documentation for the project...")
-        response = llm_client.system_completion(
-            system_prompt=system_prompt, user_prompt=user_prompt, temperature=0.7
+        response = cached_system_completion(
+            llm_client,
+            system_prompt,
+            user_prompt,
+            temperature=0.7,
+            use_cache=use_cache,
+            cache_prefix=context_prompt,
         )
 
-        with open(unit_tests_dir / f"{task_number}.md", "w") as f:
-            f.write(response)
-        previous_unit_tests += f"{unit_test_prompt}\n\n"
+        (unit_tests_dir / f"{task_number}.md").write_text(response, encoding="utf-8")
+
+    # Then generate the unit tests documentation of all tasks concurrently, after the first task
+    # has written the shared context to the provider's prompt cache
+    task_numbers = list(unit_test_prompts)
+    if not task_numbers:
+        return
+    generate_for_task(task_numbers[0])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(generate_for_task, task_numbers[1:]))
 
 
 def main() -> None:
@@ -188,6 +238,12 @@ Examples:
         help="LLM model to use for project proposal (default: neulab/claude-sonnet-4-20250514)",
     )
 
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="Reuse the LLM responses of identical earlier requests instead of calling the LLM",
+    )
+
     parser.add_argument(
         "--project-file",
         type=str,
@@ -208,21 +264,21 @@ Examples:
         print("🚀 Starting tasks proposal pipeline...\n")
 
         try:
-            with open(args.project_file, "r") as f:
-                project = json.load(f)
+            project = load_json(args.project_file)
             project_description = project["project_description"]
             constraints = project["constraints"]
         except Exception as e:
             raise Exception(f"Failed to load project file: {e}")
 
-        tasks = propose_tasks(project_description, constraints, model=args.model)
+        tasks = propose_tasks(
+            project_description, constraints, model=args.model, use_cache=args.use_cache
+        )
 
         print("✅ Successfully proposed tasks for the project!")
         print(f"📋 Tasks:\n{tasks}")
 
-        with open(args.project_file, "w") as f:
-            project["tasks"] = tasks
-            json.dump(project, f)
+        project["tasks"] = tasks
+        dump_json(project, args.project_file)
         print(f"📁 Tasks saved to: {args.project_file}")
 
         # generate_unit_tests(args.project_dir, model=args.model)
@@ -1,18 +1,45 @@
 """Repositroy Setup pipeline."""
 
 import argparse
-import json
+import hashlib
+import os
 import shutil
 import subprocess
 import sys
+import threading
 import time
+from collections import deque
 from pathlib import Path
+from typing import IO
 
 from swe_play.propose.propose_tasks import generate_unit_tests
 from swe_play.utils.call_openhands import call_openhands
-from swe_play.utils.prompt_retriever import PromptRetriever
+from swe_play.utils.clone_tree import clone_tree
+from swe_play.utils.json_utils import load_json
+from swe_play.utils.prompt_retriever import get_prompt_retriever
 from swe_play.utils.task2json import convert_md_to_json
 
+# Folder of the language-specific repository templates
+REPO_STARTER_DIR = Path(__file__).resolve().parent / "repo_starter"
+
+# Maps the lowercased programming language to its template under REPO_STARTER_DIR
+REPO_STARTER_LANGUAGES = {
+    "python": "python",
+    "c++": "c++",
+    "rust": "rust",
+    "javascript": "javascript",
+}
+
+# Number of trailing characters of the Docker build output kept for diagnosis
+DOCKER_LOG_TAIL_SIZE = 1000
+
+# Docker build errors caused by the host rather than the Dockerfile, which OpenHands cannot fix
+UNRECOVERABLE_DOCKER_ERRORS = (
+    "no space left on device",
+    "permission denied while trying to connect to the docker daemon",
+    "cannot connect to the docker daemon",
+)
+
 
 def setup_repo(
     project_description: str,
@@ -41,25 +68,19 @@ def setup_repo(
     project_id = str(int(time.time()))
 
     # Get the repo starter path based on the programming language
-    current_dir = Path(__file__).parent.absolute()
-    if programming_language.lower() == "python":
-        repo_starter_path = current_dir / "repo_starter" / "python"
-    elif programming_language.lower() == "c++":
-        repo_starter_path = current_dir / "repo_starter" / "c++"
-    elif programming_language.lower() == "rust":
-        repo_starter_path = current_dir / "repo_starter" / "rust"
-    elif programming_language.lower() == "javascript":
-        repo_starter_path = current_dir / "repo_starter" / "javascript"
-    else:
+    starter_name = REPO_STARTER_LANGUAGES.get(programming_language.lower())
+    if starter_name is None:
         raise Exception(f"Unsupported programming language: {programming_language}")
+    repo_starter_path = REPO_STARTER_DIR / starter_name
     Path(output_folder).mkdir(exist_ok=True)
     project_dir = (Path(output_folder) / repo_name).absolute()
-    if project_dir.exists():
-        raise Exception(f"Project directory already exists: {project_dir}")
 
+    # Cloning fails if the directory exists, which also guards against concurrent setups
     try:
-        shutil.copytree(repo_starter_path, project_dir)
+        clone_tree(repo_starter_path, project_dir)
         print(f"Copied repo_starter template to: {project_dir}")
+    except FileExistsError as e:
+        raise Exception(f"Project directory already exists: {project_dir}") from e
     except Exception as e:
         raise Exception(f"Failed to copy repo_starter template: {e}")
 
@@ -76,7 +97,7 @@ def setup_repo(
     )
     print("Tasks written and converted successfully")
 
-    prompt_retriever = PromptRetriever()
+    prompt_retriever = get_prompt_retriever()
     setup_prompt = prompt_retriever.get_prompt(
         "setup-project-repo-openhands",
         project_description=project_description,
@@ -105,7 +126,9 @@ def create_docker_image(project_path: str) -> str:
         docker_tag: The tag of the created Docker image
 
     Raises:
-        Exception: If Docker image creation fails even after five times OpenHands fix attempt.
+        Exception: If Docker image creation fails even after five times OpenHands fix attempt,
+            or fails because of the host (e.g. no disk space) rather than the Dockerfile,
+            or OpenHands leaves the project unchanged.
     """
     project_dir = Path(project_path)
     dockerfile_path = project_dir / "Dockerfile"
@@ -113,40 +136,78 @@ def create_docker_image(project_path: str) -> str:
         raise Exception(f"Dockerfile not found in {dockerfile_path}")
 
     tasks_file = project_dir / "tasks.json"
-    with open(tasks_file, "r") as f:
-        tasks = json.load(f)
+    tasks = load_json(tasks_file)
     repo_name = tasks["project_name"]
     project_id = tasks["project_id"]
 
     image_tag = f"stephenzhu0218/swe-playground:swe-play_{repo_name.lower()}_{project_id}"
 
     def attempt_docker_build() -> tuple[bool, str, str]:
-        """Attempt to build the docker image and return result and output."""
-        try:
-            result = subprocess.run(
-                ["docker", "build", "-t", image_tag, "."],
-                cwd=str(project_dir),
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-            return True, result.stdout, result.stderr
-        except subprocess.CalledProcessError as e:
-            return False, e.stdout if e.stdout else "", e.stderr if e.stderr else ""
-
+        """Attempt to build the docker image and return result and the tail of its output."""
+        # BuildKit builds independent stages concurrently and keeps the layers of failed builds
+        # cached, so retries after a fix only rebuild from the first changed instruction
+        process = subprocess.Popen(
+            ["docker", "build", "-t", image_tag, "."],
+            cwd=str(project_dir),
+            env={**os.environ, "DOCKER_BUILDKIT": "1"},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        assert process.stdout is not None and process.stderr is not None
+
+        # Drain both pipes concurrently so neither can fill up and block the build,
+        # keeping only the last few KB instead of the whole build log
+        tails: dict[str, deque[str]] = {"stdout": deque(), "stderr": deque()}
+
+        def drain(name: str, stream: IO[str]) -> None:
+            tail = tails[name]
+            tail_size = 0
+            for chunk in iter(lambda: stream.read(4096), ""):
+                tail.append(chunk)
+                tail_size += len(chunk)
+                while tail_size - len(tail[0]) >= DOCKER_LOG_TAIL_SIZE:
+                    tail_size -= len(tail.popleft())
+
+        readers = [
+            threading.Thread(target=drain, args=("stdout", process.stdout)),
+            threading.Thread(target=drain, args=("stderr", process.stderr)),
+        ]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        returncode = process.wait()
+
+        stdout = "".join(tails["stdout"])[-DOCKER_LOG_TAIL_SIZE:]
+        stderr = "".join(tails["stderr"])[-DOCKER_LOG_TAIL_SIZE:]
+        return returncode == 0, stdout, stderr
+
+    def fingerprint_build_context() -> str:
+        """Hash the path, size and mtime of every file that the Docker build can see."""
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(project_dir):
+            dirs[:] = sorted(d for d in dirs if d != ".git")
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{root}/{name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    prompt_retriever = get_prompt_retriever()
+    previous_errors: list[str] = []
     iter_cnt = 0
     while True:
         success, stdout, stderr = attempt_docker_build()
         if success:
             print(f"Docker image built successfully for {repo_name} after {iter_cnt + 1} attempts.")
             try:
-                # Push to Docker Hub
+                # Push to Docker Hub, discarding the progress output that was never read
                 subprocess.run(
                     ["docker", "push", image_tag],
                     cwd=str(project_dir),
                     check=True,
-                    capture_output=True,
-                    text=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                 )
                 print(f"Image pushed to Docker Hub: {image_tag}")
 
@@ -155,8 +216,8 @@ def create_docker_image(project_path: str) -> str:
                     ["docker", "rmi", image_tag],
                     cwd=str(project_dir),
                     check=True,
-                    capture_output=True,
-                    text=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                 )
                 print(f"Cleaned up local image: {image_tag}")
 
@@ -171,13 +232,23 @@ def create_docker_image(project_path: str) -> str:
                 f"Failed to build Docker image for {repo_name} after {iter_cnt} attempts."
             )
 
-        # Only last 1000 characters of stdout and stderr for fixing
-        error_msgs = f"stdout:\n{stdout[-1000:]}\nstderr:\n{stderr[-1000:]}"
-        prompt_retriever = PromptRetriever()
+        # Only last DOCKER_LOG_TAIL_SIZE characters of stdout and stderr are kept for fixing
+        error_tail = f"{stdout}\n{stderr}".lower()
+        for unrecoverable_error in UNRECOVERABLE_DOCKER_ERRORS:
+            if unrecoverable_error in error_tail:
+                raise Exception(
+                    f"Failed to build Docker image for {repo_name} due to an unrecoverable "
+                    f"error ({unrecoverable_error}):\n{stderr}"
+                )
+
+        error_msgs = f"stdout:\n{stdout}\nstderr:\n{stderr}"
         fix_dockerfile_prompt = prompt_retriever.get_prompt(
             "fix-dockerfile-openhands",
             error_msgs=error_msgs,
+            previous_errors=previous_errors,
         )
+        previous_errors.append(error_msgs)
+        context_fingerprint = fingerprint_build_context()
         try:
             openhands_output = call_openhands(
                 prompt=fix_dockerfile_prompt, directory=str(project_dir)
@@ -187,6 +258,16 @@ def create_docker_image(project_path: str) -> str:
         except Exception as e:
             raise Exception(f"OpenHands Dockerfile fix failed: {e}")
 
+        # Rebuilding the very same files would only reproduce the error
+        if fingerprint_build_context() == context_fingerprint:
+            raise Exception(
+                f"Failed to build Docker image for {repo_name}: OpenHands fix trial {iter_cnt} "
+                "did not change any file of the project."
+            )
+
+        # Back off before rebuilding, in case the failure was transient (e.g. registry rate limits)
+        time.sleep(min(2**iter_cnt, 30))
+
     return image_tag
 
 
@@ -235,14 +316,27 @@ Examples:
         ),
     )
 
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent LLM calls for test documentation generation "
+        "(default: 8)",
+    )
+
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="Reuse the LLM responses of identical earlier requests instead of calling the LLM",
+    )
+
     args = parser.parse_args()
 
     try:
         print("🚀 Starting project repo setup pipeline...\n")
 
         try:
-            with open(args.project_file, "r") as f:
-                project = json.load(f)
+            project = load_json(args.project_file)
             project_description = project["project_description"]
             constraints = project["constraints"]
             repo_name = project["repo_name"]
@@ -268,7 +362,12 @@ Examples:
             print(f"📁 Docker image created at: {image_tag}")
 
         # Move test documentation after repository setup
-        generate_unit_tests(project_path=project_path, model=args.model)
+        generate_unit_tests(
+            project_path=project_path,
+            model=args.model,
+            max_workers=args.max_workers,
+            use_cache=args.use_cache,
+        )
 
     except Exception as e:
         print(f"❌ Pipeline failed: {e}")
@@ -1,21 +1,96 @@
 """Rollout pipeline for Commit-0 specific generation."""
 
 import argparse
-import json
+import os
 import re
 import shutil
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from swe_play.utils.call_openhands import call_openhands_rollout
+from swe_play.utils.clone_tree import clone_tree
 from swe_play.utils.convert_data import convert_data
-from swe_play.utils.prompt_retriever import PromptRetriever
+from swe_play.utils.json_utils import dump_json, load_json
+from swe_play.utils.prompt_retriever import get_prompt_retriever
+from swe_play.utils.task_loader import clean_task_title
 
+# Matches the NotImplementedError statements to replace with 'pass': with arguments, at the
+# end of a line, or followed by whitespace, so each file is scanned in a single pass
+NOT_IMPLEMENTED_PATTERN = re.compile(
+    r"raise\s+NotImplementedError(?:\s*\([^)]*\)|\s*$|\s+)", re.MULTILINE
+)
 
-def replace_function_bodies_with_pass(project_dir: Path) -> None:
+# Folder of the generated projects, holding the initial repository of each project
+GENERATED_DIR = Path("/home/yiqiz2/SWE-Playground/generated")
+
+
+def iter_python_files(root: str) -> Iterator[str]:
+    """Recursively yield the paths of the Python files under a directory.
+
+    Uses `os.scandir` directly, so no Path object is built for entries that are not needed.
+    Symlinked directories are not followed.
+
+    Args:
+        root: Path to the directory to walk
+
+    Yields:
+        The path of each `.py` file, as a string
+    """
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_python_files(entry.path)
+            elif entry.name.endswith(".py"):
+                yield entry.path
+
+
+def replace_not_implemented_in_file(py_file: str) -> int:
+    """Replace NotImplementedError statements with 'pass' in a single Python file.
+
+    Args:
+        py_file: Path to the Python file
+
+    Returns:
+        The number of statements replaced, the file is only rewritten if it is not 0
+    """
+    # The whole file is read at once, so skip the buffering layer
+    with open(py_file, "rb", buffering=0) as f:
+        raw_content = f.read()
+    # Most files have nothing to replace, a substring check rules them out cheaply
+    if b"NotImplementedError" not in raw_content:
+        return 0
+    content = raw_content.decode("utf-8")
+
+    # Replace 'raise NotImplementedError' with 'pass'
+    content, replacements = NOT_IMPLEMENTED_PATTERN.subn("pass", content)
+
+    if replacements:
+        # Write a sibling file and swap it in, so the file is never left half-written
+        tmp_file = f"{py_file}.tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(content.encode("utf-8"))
+        shutil.copymode(py_file, tmp_file)
+        os.replace(tmp_file, py_file)
+    return replacements
+
+
+def replace_function_bodies_with_pass(
+    project_dir: Path,
+    max_workers: int | None = None,
+    marker_file: Path | None = None,
+) -> None:
     """Replace NotImplementedError statements with 'pass' in Python files under /src directory.
 
+    Files are processed concurrently, as they are independent of each other.
+
     Args:
         project_dir: Path to the project directory
+        max_workers: The maximum number of files processed at the same time. If None, uses
+            the ThreadPoolExecutor default
+        marker_file: Path to a JSON file recording the modification time and size of every
+            processed file. If given, files that are unchanged since the last run are skipped,
+            and the file is updated afterwards. Should be kept outside the project directory
     """
     src_dir = project_dir / "src"
     if not src_dir.exists():
@@ -26,53 +101,69 @@ def replace_function_bodies_with_pass(project_dir: Path) -> None:
 
     print(f"Replacing NotImplementedError statements with 'pass' in {src_dir}")
 
-    # Find all Python files in src directory recursively
-    python_files = list(src_dir.rglob("*.py"))
-
-    if not python_files:
+    # Walk all Python files in src directory recursively
+    py_files = list(iter_python_files(str(src_dir)))
+    if not py_files:
         print(f"No Python files found in {src_dir}")
         return
 
-    files_modified = 0
-    total_replacements = 0
+    # [mtime_ns, size] of the files processed by the last run, keyed by their relative path
+    processed: dict[str, list[int]] = {}
+    if marker_file is not None and marker_file.exists():
+        processed = load_json(marker_file)
 
-    for py_file in python_files:
+    def process_file(py_file: str) -> tuple[int, list[int] | None]:
         try:
-            with open(py_file, "r", encoding="utf-8") as f:
-                content = f.read()
-            modified = False
-
-            # Replace 'raise NotImplementedError' with 'pass'
-            patterns_to_replace = [
-                (r"raise\s+NotImplementedError\s*\([^)]*\)", "pass"),
-                (r"raise\s+NotImplementedError\s*$", "pass"),
-                (r"raise\s+NotImplementedError\s+", "pass"),
-            ]
-
-            for pattern, replacement in patterns_to_replace:
-                if re.search(pattern, content, re.MULTILINE):
-                    content = re.sub(pattern, replacement, content, flags=re.MULTILINE)
-                    modified = True
-
-            if modified:
-                with open(py_file, "w", encoding="utf-8") as f:
-                    f.write(content)
-                files_modified += 1
-                total_replacements += 1
-                print(f"  Modified {py_file.relative_to(project_dir)}")
-
+            if marker_file is None:
+                return replace_not_implemented_in_file(py_file), None
+
+            stat = os.stat(py_file)
+            signature = [stat.st_mtime_ns, stat.st_size]
+            if processed.get(os.path.relpath(py_file, project_dir)) == signature:
+                return 0, signature
+            replacements = replace_not_implemented_in_file(py_file)
+            if replacements:
+                stat = os.stat(py_file)
+                signature = [stat.st_mtime_ns, stat.st_size]
+            return replacements, signature
         except Exception as e:
             print(f"  Error processing {py_file}: {e}")
+            return 0, None
 
-    print(f"Completed NotImplementedError replacement: {files_modified} files modified")
+    files_modified = 0
+    total_replacements = 0
+    signatures: dict[str, list[int]] = {}
+    # Modified files are reported together at the end, in a single write
+    modified_lines: list[str] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for py_file, (replacements, signature) in zip(
+            py_files, executor.map(process_file, py_files)
+        ):
+            relative_path = os.path.relpath(py_file, project_dir)
+            if signature is not None:
+                signatures[relative_path] = signature
+            if replacements:
+                files_modified += 1
+                total_replacements += replacements
+                modified_lines.append(f"  Modified {relative_path}")
+
+    if marker_file is not None:
+        dump_json(signatures, marker_file)
+
+    if modified_lines:
+        print("\n".join(modified_lines))
+    print(
+        f"Completed NotImplementedError replacement: {files_modified} files modified, "
+        f"{total_replacements} statements replaced"
+    )
 
 
-def cleanup_test_files(project_dir: Path, all_task_data: dict) -> None:
+def cleanup_test_files(project_dir: Path, task_titles: dict[str, str]) -> None:
     """Clean up test files by removing bash scripts and renaming Python test files for all tasks.
 
     Args:
         project_dir: Path to the project directory
-        all_task_data: Dictionary containing all task information keyed by task_number
+        task_titles: Dictionary containing the title of each task keyed by task_number
     """
     tests_dir = project_dir / "tests"
     if not tests_dir.exists():
@@ -81,45 +172,47 @@ def cleanup_test_files(project_dir: Path, all_task_data: dict) -> None:
 
     print(f"Cleaning up test files for all tasks in {tests_dir}")
 
-    for task_number, task_data in all_task_data.items():
-        task_title = task_data.get("task_title", "")
+    # List the directory once, so existence and name conflicts are checked in memory
+    existing_files = {entry.name for entry in os.scandir(tests_dir)}
+    # Renames are reported together at the end, in a single write
+    renamed_lines: list[str] = []
 
+    for task_number, task_title in task_titles.items():
         # Convert task_number format for file operations (replace dots with underscores)
         task_number_file = task_number.replace(".", "_")
 
-        # Remove bash test script
-        bash_script = tests_dir / f"{task_number}.sh"
-        if bash_script.exists():
-            bash_script.unlink()
-
-        # Remove bash test script
-        markdown_script = tests_dir / f"{task_number}.md"
-        if markdown_script.exists():
-            markdown_script.unlink()
+        # Remove bash test script and unit tests proposal
+        for script_name in (f"{task_number}.sh", f"{task_number}.md"):
+            (tests_dir / script_name).unlink(missing_ok=True)
+            existing_files.discard(script_name)
 
         # Rename Python test file using task title (without "test_" prefix)
         python_test_file = tests_dir / f"test_{task_number_file}.py"
-        if python_test_file.exists() and task_title:
-            # Clean task title for filename; strip special chars and replace spaces
-            clean_title = re.sub(r"[^\w\s-]", "", task_title).strip()
-            clean_title = re.sub(r"[-\s]+", "_", clean_title).lower()
+        if python_test_file.name in existing_files and task_title:
+            clean_title = clean_task_title(task_title)
             new_python_file = tests_dir / f"test_{clean_title}.py"
 
             # Avoid name conflicts
             counter = 1
-            while new_python_file.exists() and new_python_file != python_test_file:
+            while new_python_file.name in existing_files and new_python_file != python_test_file:
                 new_python_file = tests_dir / f"{clean_title}_{counter}.py"
                 counter += 1
 
             if new_python_file != python_test_file:
                 python_test_file.rename(new_python_file)
-                print(f"Renamed Python test file: {python_test_file} -> {new_python_file}")
-
+                existing_files.discard(python_test_file.name)
+                existing_files.add(new_python_file.name)
+                renamed_lines.append(
+                    f"Renamed Python test file: {python_test_file} -> {new_python_file}"
+                )
+
+    if renamed_lines:
+        print("\n".join(renamed_lines))
     print("Completed test file cleanup for all tasks")
 
 
 def finish_commit0(
-    project_name: str,
+    fix_issue_prompt: str,
     project_dir: Path,
     log_dir: Path,
 ) -> None:
@@ -129,19 +222,14 @@ def finish_commit0(
     This completes the SWE-bench pipeline by having an agent solve the generated problem.
 
     Args:
-        project_name: The name of the project
+        fix_issue_prompt: The rendered "finish-full-openhands" prompt of the project, which
+            is the same for every iteration
         project_dir: Path to the project directory containing the buggy code
         log_dir: Path to the log directory
 
     Raises:
         Exception: If OpenHands issue fixing fails
     """
-    prompt_retriever = PromptRetriever()
-    fix_issue_prompt = prompt_retriever.get_prompt(
-        "finish-full-openhands",
-        workspace_dir_name=project_name,
-    )
-
     try:
         openhands_output = call_openhands_rollout(
             prompt=fix_issue_prompt,
@@ -158,63 +246,37 @@ def main(repo_path: str, runtime_folder: str, num_iterations: int = 1) -> None:
     project_dir = Path(repo_path)
     runtime_dir = Path(runtime_folder)
 
-    with open(project_dir / "tasks.json", "r") as f:
-        task = json.load(f)
+    task = load_json(project_dir / "tasks.json")
     project_name = task["project_name"]
 
-    unit_tests_by_task = {}  # Dictionary to group tests by task number
+    # Only the titles of the tasks are used, so skip building the full test records
+    task_titles: dict[str, str] = {}  # Dictionary of task titles keyed by task number
 
     for phase in task["phases"]:
         for module in phase.get("modules", []):
             for task_item in module.get("tasks", []):
-                task_number = task_item.get("task_number")
                 unit_tests = task_item.get("unit_tests", {})
-                code_tests = unit_tests.get("code_tests", [])
-                visual_tests = unit_tests.get("visual_tests", [])
 
                 # Only process tasks that have actual tests
-                if code_tests or visual_tests:
-                    # Combine all tests for this task X.Y.Z
-                    all_tests_for_task = []
-                    for test in code_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "code",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-                    for test in visual_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "visual",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-
-                    unit_tests_by_task[task_number] = {
-                        "task_number": task_number,
-                        "task_title": task_item.get("title"),
-                        "task_description": task_item.get("description"),
-                        "phase_number": phase.get("phase_number"),
-                        "module_number": module.get("module_number"),
-                        "all_tests": all_tests_for_task,
-                        "total_tests": len(all_tests_for_task),
-                    }
-
-    # Find the last task with valid unit test and implementation logs
+                if unit_tests.get("code_tests") or unit_tests.get("visual_tests"):
+                    task_titles[task_item.get("task_number")] = task_item.get("title") or ""
+
+    # Find the last task with valid unit test and implementation logs, searching from the end
     last_valid_task = None
 
-    for task_number, task_data in unit_tests_by_task.items():
-        check_path_implementation = (
-            runtime_dir / "converted_data" / f"{task_number}_implementation.json"
-        )
-        check_path_unit_test = runtime_dir / "converted_data" / f"{task_number}_unit_test.json"
-        if check_path_implementation.exists() and check_path_unit_test.exists():
+    # List the converted data once, so the logs of each task are checked in memory
+    try:
+        converted_files = {entry.name for entry in os.scandir(runtime_dir / "converted_data")}
+    except FileNotFoundError:
+        converted_files = set()
+
+    for task_number in reversed(task_titles):
+        if (
+            f"{task_number}_implementation.json" in converted_files
+            and f"{task_number}_unit_test.json" in converted_files
+        ):
             last_valid_task = task_number
-        else:
-            continue
+            break
 
     if last_valid_task is None:
         print("❌ No tasks found with valid unit test and implementation logs.")
@@ -228,7 +290,7 @@ def main(repo_path: str, runtime_folder: str, num_iterations: int = 1) -> None:
 
     # Generate raw data once (same for all iterations)
     print(f"\n📦 Preparing raw data for project {project_name} and task {task_number}...")
-    init_repo_dir = Path("/home/yiqiz2/SWE-Playground/generated") / f"{project_name}"
+    init_repo_dir = GENERATED_DIR / f"{project_name}"
     gt_implementation_tests_dir = (
         runtime_dir / f"{project_name}_{task_number}_implementation" / "tests"
     )
@@ -237,17 +299,29 @@ def main(repo_path: str, runtime_folder: str, num_iterations: int = 1) -> None:
     commit0_raw_dir = runtime_dir / "commit0_raw" / f"{project_name}"
     if commit0_raw_dir.exists():
         shutil.rmtree(commit0_raw_dir)
-    shutil.copytree(init_repo_dir, commit0_raw_dir)
-    commit0_raw_tests_dir = commit0_raw_dir / "tests"
-    if commit0_raw_tests_dir.exists():
-        shutil.rmtree(commit0_raw_tests_dir)
-    shutil.copytree(gt_implementation_tests_dir, commit0_raw_tests_dir)
+    # The tests of the initial repository are replaced by the ground truth ones, so skip them
+    clone_tree(
+        init_repo_dir,
+        commit0_raw_dir,
+        ignore=lambda src, names: ["tests"] if Path(src) == init_repo_dir else [],
+    )
+    clone_tree(gt_implementation_tests_dir, commit0_raw_dir / "tests")
 
     # Replace all function bodies with pass while preserving docstrings in /src directory
-    replace_function_bodies_with_pass(commit0_raw_dir)
-    cleanup_test_files(commit0_raw_dir, unit_tests_by_task)
+    # The marker is kept next to the raw data, so it is not copied into the iterations
+    replace_function_bodies_with_pass(
+        commit0_raw_dir,
+        marker_file=runtime_dir / "commit0_raw" / f".{project_name}.nie_processed.json",
+    )
+    cleanup_test_files(commit0_raw_dir, task_titles)
     print("✅ Raw data preparation completed!")
 
+    # The prompt only depends on the project, so render it once for all iterations
+    fix_issue_prompt = get_prompt_retriever().get_prompt(
+        "finish-full-openhands",
+        workspace_dir_name=project_name,
+    )
+
     # Run the pipeline for the specified number of iterations
     for iteration in range(1, num_iterations + 1):
         print(f"\n{'='*60}")
@@ -271,10 +345,12 @@ def main(repo_path: str, runtime_folder: str, num_iterations: int = 1) -> None:
 
         if commit0_dir.exists():
             shutil.rmtree(commit0_dir)
-        shutil.copytree(commit0_raw_dir, commit0_dir)
+        # Reflinked where supported, so iterations share the data blocks of the raw tree
+        # until OpenHands edits a file
+        clone_tree(commit0_raw_dir, commit0_dir)
 
         try:
-            finish_commit0(project_name, commit0_dir_openhands, log_dir)
+            finish_commit0(fix_issue_prompt, commit0_dir_openhands, log_dir)
             if num_iterations == 1:
                 convert_data(str(runtime_dir), str(log_dir), "commit0", "commit0")
             else:
@@ -1,16 +1,39 @@
 """Rollout pipeline for automated project task completion and testing."""
 
 import argparse
-import json
 import shutil
 import subprocess
+import sys
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from swe_play.rollout import commit0, swe_bench, swt_bench
 from swe_play.utils.call_openhands import call_openhands_rollout
+from swe_play.utils.clone_tree import clone_tree
 from swe_play.utils.convert_data import convert_data
-from swe_play.utils.prompt_retriever import PromptRetriever
+from swe_play.utils.json_utils import load_json
+from swe_play.utils.prompt_retriever import get_prompt_retriever
+from swe_play.utils.run_tests import UNIT_TEST_TIMEOUT, run_test_command
+from swe_play.utils.task_loader import build_unit_tests_index
+
+
+class TaskFailedError(Exception):
+    """Raised when a task still fails its unit tests after all trials.
+
+    Attributes:
+        tasks_finished: The number of tasks finished by the rollout before the failed task.
+    """
+
+    def __init__(self, message: str, tasks_finished: int):
+        """Initialize the error.
+
+        Args:
+            message: The error message.
+            tasks_finished: The number of tasks finished by the rollout before the failed task.
+        """
+        super().__init__(message)
+        self.tasks_finished = tasks_finished
 
 
 def generate_unit_test(
@@ -29,13 +52,15 @@ def generate_unit_test(
     """
     unit_tests_dir = project_dir / "tests"
 
-    test_prompt = f"Task {task_number}: {task_data['total_tests']} total tests\n"
-    for test in task_data["all_tests"]:
-        test_prompt += f"  - {test['type']}: {test['name']}\n"
-    with open(unit_tests_dir / f"{task_number}.md", "r") as f:
-        test_prompt += f"The detailed unit tests proposal:\n\n{f.read()}"
+    test_prompt_parts = [f"Task {task_number}: {task_data['total_tests']} total tests\n"]
+    test_prompt_parts.extend(
+        f"  - {test['type']}: {test['name']}\n" for test in task_data["all_tests"]
+    )
+    unit_tests_proposal = (unit_tests_dir / f"{task_number}.md").read_text(encoding="utf-8")
+    test_prompt_parts.append(f"The detailed unit tests proposal:\n\n{unit_tests_proposal}")
+    test_prompt = "".join(test_prompt_parts)
 
-    prompt_retriever = PromptRetriever()
+    prompt_retriever = get_prompt_retriever()
     unit_test_creation_prompt = prompt_retriever.get_prompt(
         "generate-unit-test-openhands",
         project_task=project_description,
@@ -85,7 +110,7 @@ def finish_task(
     Raises:
         Exception: If OpenHands task completion fails
     """
-    prompt_retriever = PromptRetriever()
+    prompt_retriever = get_prompt_retriever()
     finish_task_prompt = prompt_retriever.get_prompt(
         "finish-task-openhands",
         task_number=task_number,
@@ -104,26 +129,52 @@ def finish_task(
         raise Exception(f"OpenHands setup failed: {e}")
 
 
+def files_identical(file_a: Path, file_b: Path) -> bool:
+    """Check if two files have the same content, comparing them in process.
+
+    Test files are small, so each one is read whole with a single read call rather than
+    stat'ed and compared in chunks.
+
+    Args:
+        file_a: Path to the first file
+        file_b: Path to the second file
+
+    Returns:
+        True if both files exist and their bytes are equal, False otherwise
+    """
+    try:
+        return file_a.read_bytes() == file_b.read_bytes()
+    except FileNotFoundError:
+        return False
+
+
 def check_unit_test_diff(
-    unit_test_tests_dir: Path, implementation_tests_dir: Path, all_tasks: list[str]
+    unit_test_tests_dir: Path,
+    implementation_tests_dir: Path,
+    all_tasks: list[str],
+    verbose_diff: bool = False,
+    max_workers: int | None = None,
 ) -> bool:
     """Check if unit tests have been modified between unit test and implementation phases.
 
     Compares test files between the unit test generation phase and the implementation phase
-    to ensure tests haven't been inadvertently modified during implementation.
+    to ensure tests haven't been inadvertently modified during implementation. The files of
+    different tasks are compared concurrently.
 
     Args:
         unit_test_tests_dir: Path to the unit test directory
         implementation_tests_dir: Path to the implementation test directory
         all_tasks: List of all task numbers to check
+        verbose_diff: Whether to print a unified diff of the modified test files
+        max_workers: The maximum number of tasks compared at the same time. If None, uses
+            the ThreadPoolExecutor default
 
     Raises:
         Exception: If diff command execution fails
     """
 
-    flag = True
-
-    for task_number in all_tasks:
+    def find_changed_files(task_number: str) -> list[tuple[Path, Path]]:
+        """Get the (unit test, implementation) pairs of the modified test files of a task."""
         task_number_str = task_number.replace(".", "_")
 
         bash_script_path_unit_test = unit_test_tests_dir / "tests" / f"{task_number}.sh"
@@ -133,34 +184,40 @@ def check_unit_test_diff(
             implementation_tests_dir / "tests" / f"test_{task_number_str}.py"
         )
 
-        try:
-            result_bash = subprocess.run(
-                [
-                    "diff",
-                    "-u",
-                    str(bash_script_path_unit_test),
-                    str(bash_script_path_implementation),
-                ],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            result_python = subprocess.run(
-                [
-                    "diff",
-                    "-u",
-                    str(python_file_path_unit_test),
-                    str(python_file_path_implementation),
-                ],
-                capture_output=True,
-                text=True,
-                check=False,
+        # Only equality matters, so compare the bytes in process instead of spawning diff
+        return [
+            (file_unit_test, file_implementation)
+            for file_unit_test, file_implementation in (
+                (bash_script_path_unit_test, bash_script_path_implementation),
+                (python_file_path_unit_test, python_file_path_implementation),
             )
-            if result_bash.returncode != 0 or result_python.returncode != 0:
-                print(f"Differences found in unit tests of Task {task_number}.")
-                flag = False
-        except Exception as e:
-            raise Exception(f"Error running diff: {e}")
+            if not files_identical(file_unit_test, file_implementation)
+        ]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        changed_files_by_task = list(executor.map(find_changed_files, all_tasks))
+
+    flag = True
+
+    # Report in task order, as the comparisons may finish in any order
+    for task_number, changed_files in zip(all_tasks, changed_files_by_task):
+        if not changed_files:
+            continue
+
+        print(f"Differences found in unit tests of Task {task_number}.")
+        flag = False
+
+        if verbose_diff:
+            for file_unit_test, file_implementation in changed_files:
+                # Let diff write to the inherited stdout instead of capturing and decoding it
+                sys.stdout.flush()
+                try:
+                    subprocess.run(
+                        ["diff", "-u", str(file_unit_test), str(file_implementation)],
+                        check=False,
+                    )
+                except Exception as e:
+                    raise Exception(f"Error running diff: {e}")
 
     if flag:
         print("No differences found in unit tests of all tasks.")
@@ -168,12 +225,56 @@ def check_unit_test_diff(
     return flag
 
 
-def run_unit_tests(project_dir: Path, all_tasks: list[str]) -> bool:
+def run_unit_test(project_dir: Path, task: str) -> bool:
+    """Run the unit tests of a single task in the specified project directory.
+
+    Args:
+        project_dir: The Path to the project directory
+        task: The task number to test
+
+    Returns:
+        True if the tests pass, False otherwise
+
+    Raises:
+        Exception: If test script does not exist
+    """
+    test_script = project_dir / "tests" / f"{task}.sh"
+    if not test_script.exists():
+        # Debug: Show what files actually exist in the tests directory
+        tests_dir = project_dir / "tests"
+        if tests_dir.exists():
+            existing_files = list(tests_dir.iterdir())
+            print(f"Tests directory {tests_dir} exists but does not contain {task}.sh")
+            print(f"Available files in tests directory: {existing_files}")
+        else:
+            print(f"Tests directory {tests_dir} does not exist")
+        raise Exception(f"Test script {test_script} does not exist.")
+
+    # Only the exit status is used, so the output is discarded instead of captured
+    returncode = run_test_command(["bash", str(test_script)], project_dir)
+    if returncode is None:
+        print(
+            f"\033[91m[Timeout] Unit test for task {task} timed out after "
+            f"{UNIT_TEST_TIMEOUT} seconds.\033[0m"
+        )
+        return False
+    if returncode == 0:
+        print(f"Unit test for task {task} successfully executed and passed.")
+        return True
+    print(f"Unit test failed for task {task}.")
+    return False
+
+
+def run_unit_tests(project_dir: Path, all_tasks: list[str], max_workers: int = 1) -> bool:
     """Run the unit tests for all tasks in the specified project directory.
 
+    The tests stop at the first failing task. With more than one worker, the test scripts of
+    different tasks run concurrently, which requires them not to share any output files.
+
     Args:
         project_dir: The Path to the project directory
         all_tasks: List of all task numbers to test
+        max_workers: The maximum number of test scripts running at the same time
 
     Returns:
         True if all tests pass, False otherwise
@@ -181,41 +282,55 @@ def run_unit_tests(project_dir: Path, all_tasks: list[str]) -> bool:
     Raises:
         Exception: If test script does not exist
     """
-    for task in all_tasks:
-        test_script = project_dir / "tests" / f"{task}.sh"
-        if not test_script.exists():
-            # Debug: Show what files actually exist in the tests directory
-            tests_dir = project_dir / "tests"
-            if tests_dir.exists():
-                existing_files = list(tests_dir.iterdir())
-                print(f"Tests directory {tests_dir} exists but does not contain {task}.sh")
-                print(f"Available files in tests directory: {existing_files}")
-            else:
-                print(f"Tests directory {tests_dir} does not exist")
-            raise Exception(f"Test script {test_script} does not exist.")
-
-        result = subprocess.run(
-            ["bash", str(test_script)],
-            cwd=str(project_dir),
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode == 0:
-            print(f"Unit test for task {task} successfully executed and passed.")
-        else:
-            print(f"Unit test failed for task {task}.")
-            return False
+    if max_workers <= 1:
+        return all(run_unit_test(project_dir, task) for task in all_tasks)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_unit_test, project_dir, task) for task in all_tasks]
+        # Check the results in order, so failures are reported as in a sequential run
+        for future in futures:
+            if not future.result():
+                for pending in futures:
+                    pending.cancel()
+                return False
 
     return True
 
 
+def create_runtime_dir(runtime_folder: str) -> Path:
+    """Create a new runtime directory named after the current time.
+
+    The directory is created atomically, and a counter is appended to its name if another
+    rollout started in the same second, so concurrent rollouts never share a directory.
+
+    Args:
+        runtime_folder: The folder to create the runtime directory in
+
+    Returns:
+        Path to the created runtime directory
+    """
+    runtime_name = f"runtime_{int(time.time())}"
+    runtime_dir = Path(runtime_folder) / runtime_name
+    suffix = 1
+    while True:
+        try:
+            runtime_dir.mkdir(parents=True)
+            return runtime_dir
+        except FileExistsError:
+            runtime_dir = Path(runtime_folder) / f"{runtime_name}_{suffix}"
+            suffix += 1
+
+
 def main(
     repo_path: str,
     runtime_folder: str,
     generate_swe: bool = False,
     generate_swt: bool = False,
     generate_commit0: bool = False,
-) -> None:
+    max_parallel: int = 1,
+    verbose_diff: bool = False,
+    test_workers: int = 1,
+) -> int:
     """Main rollout pipeline for automated project task completion.
 
     Executes a complete rollout pipeline that:
@@ -226,7 +341,8 @@ def main(
        - Validates implementation against unit tests
        - Retries up to 3 times if tests fail
     3. Continues until all tasks are completed or maximum retries exceeded
-    4. Optionally generates task-specific data (SWE-bench, SWT-Bench, Commit-0)
+    4. Optionally generates task-specific data (SWE-bench, SWT-Bench, Commit-0), concurrently
+       if `max_parallel` allows
 
     Args:
         repo_path: The path of the project repository to process
@@ -234,62 +350,33 @@ def main(
         generate_swe: Whether to generate SWE-bench data after rollout
         generate_swt: Whether to generate SWT-Bench data after rollout
         generate_commit0: Whether to generate Commit-0 data after rollout
+        max_parallel: The maximum number of task-specific data generators running at the
+            same time. The rollout itself is always sequential, as each task builds on the
+            implementation of the previous one
+        verbose_diff: Whether to print a unified diff of the test files modified during
+            implementation
+        test_workers: The maximum number of unit test scripts running at the same time when
+            validating an implementation
+
+    Returns:
+        The number of tasks finished by the rollout
 
     Raises:
+        TaskFailedError: If a task still fails its unit tests after three trials. The number
+            of tasks finished before it is available as its `tasks_finished` attribute
         Exception: If project configuration cannot be loaded or critical failures occur
     """
     project_dir = Path(repo_path)
-    runtime_dir = Path(runtime_folder) / f"runtime_{str(int(time.time()))}"
-    runtime_dir.mkdir(parents=True, exist_ok=True)
+    runtime_dir = create_runtime_dir(runtime_folder)
     converted_data_dir = runtime_dir / "converted_data"
-    converted_data_dir.mkdir(parents=True, exist_ok=True)
+    converted_data_dir.mkdir()
 
-    with open(project_dir / "tasks.json", "r") as f:
-        task = json.load(f)
+    task = load_json(project_dir / "tasks.json")
     project_name = task["project_name"]
     project_description = task["project_description"]
     constraints = task["constraints"]
 
-    unit_tests_by_task = {}  # Dictionary to group tests by task number
-
-    for phase in task["phases"]:
-        for module in phase.get("modules", []):
-            for task_item in module.get("tasks", []):
-                task_number = task_item.get("task_number")
-                unit_tests = task_item.get("unit_tests", {})
-                code_tests = unit_tests.get("code_tests", [])
-                visual_tests = unit_tests.get("visual_tests", [])
-
-                # Only process tasks that have actual tests
-                if code_tests or visual_tests:
-                    # Combine all tests for this task X.Y.Z
-                    all_tests_for_task = []
-                    for test in code_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "code",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-                    for test in visual_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "visual",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-
-                    unit_tests_by_task[task_number] = {
-                        "task_number": task_number,
-                        "task_title": task_item.get("title"),
-                        "task_description": task_item.get("description"),
-                        "phase_number": phase.get("phase_number"),
-                        "module_number": module.get("module_number"),
-                        "all_tests": all_tests_for_task,
-                        "total_tests": len(all_tests_for_task),
-                    }
+    unit_tests_by_task = build_unit_tests_index(task)
 
     all_tasks: list[str] = []
     tasks_cnt = 0
@@ -300,22 +387,24 @@ def main(
 
         print(f"\nRunning pipeline for task {task_number}...")
 
+        # The directories of a task are the same for every trial
+        project_dir_unit_test = runtime_dir / f"{project_name}_{task_number}_unit_test"
+        project_dir_implementation = runtime_dir / f"{project_name}_{task_number}_implementation"
+        save_dir_unit_test = runtime_dir / f"log_{task_number}_unit_test"
+        save_dir_implementation = runtime_dir / f"log_{task_number}_implementation"
+
         iter_cnt = 1
         while True:
             print(f"Trial {iter_cnt} for task {task_number}...")
             # Generate unit test
             # Copy the project directory to the runtime_dir
-            project_dir_unit_test = runtime_dir / f"{project_name}_{task_number}_unit_test"
-            save_dir_unit_test = runtime_dir / f"log_{task_number}_unit_test"
-            save_dir_implementation = runtime_dir / f"log_{task_number}_implementation"
-
             if project_dir_unit_test.exists():
                 print(
                     "Project directory for task "
                     f"{task_number} already exists. Skipping unit test generation."
                 )
             else:
-                shutil.copytree(project_dir, project_dir_unit_test)
+                clone_tree(project_dir, project_dir_unit_test)
                 print("Calling Openhands to generate unit test...")
                 generate_unit_test(
                     task_number,
@@ -327,10 +416,6 @@ def main(
 
             # Rollout data
             # First we employ OpenHands to finish the task
-            project_dir_implementation = (
-                runtime_dir / f"{project_name}_{task_number}_implementation"
-            )
-
             if project_dir_implementation.exists():
                 print(
                     "Project directory for task "
@@ -338,7 +423,7 @@ def main(
                 )
                 break
             else:
-                shutil.copytree(project_dir_unit_test, project_dir_implementation)
+                clone_tree(project_dir_unit_test, project_dir_implementation)
                 print("Calling Openhands to finish the task...")
                 finish_task(
                     task_number,
@@ -351,7 +436,10 @@ def main(
                 # Then run the unit tests to check correctness
                 # Call the function to check for unit test modifications
                 res_diff = check_unit_test_diff(
-                    project_dir_unit_test, project_dir_implementation, all_tasks
+                    project_dir_unit_test,
+                    project_dir_implementation,
+                    all_tasks,
+                    verbose_diff=verbose_diff,
                 )
                 if not res_diff:
                     # Copy the unit tests from unit_test to implementation
@@ -373,7 +461,7 @@ def main(
                         )
 
                     try:
-                        shutil.copytree(unit_test_tests_dir, implementation_tests_dir)
+                        clone_tree(unit_test_tests_dir, implementation_tests_dir)
                     except Exception as e:
                         raise Exception(
                             "Failed to copy tests from "
@@ -387,7 +475,9 @@ def main(
                         print(f"Destination directory contains: {dest_files}")
 
                 # Then run the unit tests to check correctness
-                res_test = run_unit_tests(project_dir_implementation, all_tasks)
+                res_test = run_unit_tests(
+                    project_dir_implementation, all_tasks, max_workers=test_workers
+                )
                 if res_test:
                     tasks_cnt += 1
                     convert_data(
@@ -404,11 +494,11 @@ def main(
                     print("Unit test failed for the current task. Conduct another trial.")
                     iter_cnt += 1
                     if iter_cnt > 3:
-                        print(
-                            f"Three trials failed for the current task. "
-                            f"Project exits with {tasks_cnt} tasks finished."
+                        raise TaskFailedError(
+                            f"Three trials failed for task {task_number}. "
+                            f"Project exits with {tasks_cnt} tasks finished.",
+                            tasks_finished=tasks_cnt,
                         )
-                        exit(0)
                     shutil.rmtree(project_dir_implementation)
                     shutil.rmtree(project_dir_unit_test)
 
@@ -417,35 +507,38 @@ def main(
     print(f"Rollout pipeline completed successfully. Totally {tasks_cnt} tasks finished.")
 
     # Generate task-specific data if requested
+    # The generators only read the rollout results and write to separate folders, and the
+    # OpenHands calls are independent of each other, so they can run concurrently
+    # Each generator is only imported when requested, and before any thread starts
+    generators: list[tuple[str, Callable[[str, str], None]]] = []
     if generate_swe:
-        print("\n" + "=" * 60)
-        print("Generating SWE-bench data...")
-        print("=" * 60)
-        try:
-            swe_bench.main(repo_path, runtime_folder)
-            print("✅ SWE-bench data generation completed successfully!")
-        except Exception as e:
-            print(f"⚠️  SWE-bench data generation failed: {e}")
+        from swe_play.rollout import swe_bench
 
+        generators.append(("SWE-bench", swe_bench.main))
     if generate_swt:
-        print("\n" + "=" * 60)
-        print("Generating SWT-Bench data...")
-        print("=" * 60)
-        try:
-            swt_bench.main(repo_path, runtime_folder)
-            print("✅ SWT-Bench data generation completed successfully!")
-        except Exception as e:
-            print(f"⚠️  SWT-Bench data generation failed: {e}")
+        from swe_play.rollout import swt_bench
 
+        generators.append(("SWT-Bench", swt_bench.main))
     if generate_commit0:
+        from swe_play.rollout import commit0
+
+        generators.append(("Commit-0", commit0.main))
+
+    def run_generator(name: str, generate: Callable[[str, str], None]) -> None:
+        """Generate the data of a single benchmark, reporting failures without raising."""
         print("\n" + "=" * 60)
-        print("Generating Commit-0 data...")
+        print(f"Generating {name} data...")
         print("=" * 60)
         try:
-            commit0.main(repo_path, runtime_folder)
-            print("✅ Commit-0 data generation completed successfully!")
+            generate(repo_path, runtime_folder)
+            print(f"✅ {name} data generation completed successfully!")
         except Exception as e:
-            print(f"⚠️  Commit-0 data generation failed: {e}")
+            print(f"⚠️  {name} data generation failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        list(executor.map(lambda generator: run_generator(*generator), generators))
+
+    return tasks_cnt
 
 
 if __name__ == "__main__":
@@ -465,6 +558,8 @@ Examples:
       # Generate SWE-bench and SWT-Bench data
   python -m swe_play.rollout.rollout --repo-path /path/to/my_project --commit0
       # Generate Commit-0 data
+  python -m swe_play.rollout.rollout --repo-path /path/to/my_project --swe --swt --commit0
+      --max-parallel 3                                      # Generate all data concurrently
         """,
     )
 
@@ -500,12 +595,41 @@ Examples:
         help="Generate Commit-0 data after completing the rollout",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=1,
+        help="Maximum number of task-specific data generators running at the same time "
+        "(default: 1)",
+    )
+
+    parser.add_argument(
+        "--verbose-diff",
+        action="store_true",
+        help="Print a unified diff of the unit tests modified during implementation",
+    )
 
-    main(
-        args.repo_path,
-        args.runtime_folder,
-        generate_swe=args.swe,
-        generate_swt=args.swt,
-        generate_commit0=args.commit0,
+    parser.add_argument(
+        "--test-workers",
+        type=int,
+        default=1,
+        help="Maximum number of unit test scripts running at the same time (default: 1)",
     )
+
+    args = parser.parse_args()
+
+    try:
+        main(
+            args.repo_path,
+            args.runtime_folder,
+            generate_swe=args.swe,
+            generate_swt=args.swt,
+            generate_commit0=args.commit0,
+            max_parallel=args.max_parallel,
+            verbose_diff=args.verbose_diff,
+            test_workers=args.test_workers,
+        )
+    except TaskFailedError as e:
+        # The rollout stops at the first failed task, keeping the tasks finished so far
+        print(e)
+        sys.exit(0)
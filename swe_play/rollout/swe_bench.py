@@ -1,16 +1,20 @@
 """Rollout pipeline for SWE-bench specific generation."""
 
 import argparse
-import json
-import re
 import shutil
-import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from swe_play.utils.call_openhands import call_openhands_rollout
+from swe_play.utils.clone_tree import clone_tree
 from swe_play.utils.convert_data import convert_data
-from swe_play.utils.llm_client import create_llm_client
-from swe_play.utils.prompt_retriever import PromptRetriever
+from swe_play.utils.issue_parser import parse_issue_proposal
+from swe_play.utils.json_utils import load_json
+from swe_play.utils.llm_cache import cached_system_completion
+from swe_play.utils.llm_client import get_llm_client
+from swe_play.utils.prompt_retriever import get_prompt_retriever
+from swe_play.utils.run_tests import UNIT_TEST_TIMEOUT, run_test_command
+from swe_play.utils.task_loader import build_unit_tests_index
 
 
 def propose_issue(
@@ -19,6 +23,7 @@ def propose_issue(
     project_dir: Path,
     task_number: str,
     model: str = "claude-sonnet-4-20250514",
+    use_cache: bool = False,
 ) -> tuple[str, str]:
     """Generate both technical issue and user-friendly description for a specific task.
 
@@ -28,6 +33,8 @@ def propose_issue(
         project_dir: Path to the project directory
         task_number: The task number
         model: The LLM model to use for issue proposal
+        use_cache: Whether to reuse the response of an identical earlier request. Only useful
+            for the first issue of a task, as a retry needs a different issue
 
     Returns:
         tuple[str, str]: (technical_issue, user_description) where:
@@ -39,21 +46,23 @@ def propose_issue(
     """
     unit_tests_dir = project_dir / "tests"
 
-    test_prompt = f"Task {task_number}: {task_data['total_tests']} total tests\n"
-    for test in task_data["all_tests"]:
-        test_prompt += f"  - {test['type']}: {test['name']}\n"
-    with open(unit_tests_dir / f"{task_number}.md", "r") as f:
-        test_prompt += f"The detailed unit tests proposal:\n\n{f.read()}"
+    test_prompt_parts = [f"Task {task_number}: {task_data['total_tests']} total tests\n"]
+    test_prompt_parts.extend(
+        f"  - {test['type']}: {test['name']}\n" for test in task_data["all_tests"]
+    )
+    unit_tests_proposal = (unit_tests_dir / f"{task_number}.md").read_text(encoding="utf-8")
+    test_prompt_parts.append(f"The detailed unit tests proposal:\n\n{unit_tests_proposal}")
+    test_prompt = "".join(test_prompt_parts)
 
     task_number = task_number.replace(".", "_")
     code_file = project_dir / "tests" / f"test_{task_number}.py"
-    if not code_file.exists():
+    try:
+        test_code = code_file.read_text(encoding="utf-8")
+    except FileNotFoundError:
         raise Exception(f"Code file {code_file} does not exist")
-    with open(code_file, "r") as f:
-        test_code = f.read()
 
-    llm_client = create_llm_client(model=model)
-    prompt_retriever = PromptRetriever()
+    llm_client = get_llm_client(model)
+    prompt_retriever = get_prompt_retriever()
 
     system_prompt = prompt_retriever.get_prompt("propose-issue-system")
     user_prompt = prompt_retriever.get_prompt(
@@ -64,25 +73,17 @@ def propose_issue(
     )
 
     print("Calling LLM to propose issues in SWE-bench format...")
-    response = llm_client.system_completion(
-        system_prompt=system_prompt, user_prompt=user_prompt, temperature=0.7
+    # The prompts are the same for every trial of a task, so Claude caches all of them
+    response = cached_system_completion(
+        llm_client,
+        system_prompt,
+        user_prompt,
+        temperature=0.7,
+        use_cache=use_cache,
+        cache_prefix=user_prompt if "claude" in model.lower() else None,
     )
 
-    # Extract technical issue for applying bug
-    issue_pattern = r"<issue>(.*?)</issue>"
-    issue_matches = re.findall(issue_pattern, response, re.DOTALL)
-
-    # Extract user-friendly description for fixing bug
-    description_pattern = r"<description>(.*?)</description>"
-    description_matches = re.findall(description_pattern, response, re.DOTALL)
-
-    if not issue_matches or not description_matches:
-        raise Exception("LLM response missing required <issue> or <description> tags")
-
-    technical_issue = issue_matches[0].strip()
-    user_description = description_matches[0].strip()
-
-    return technical_issue, user_description
+    return parse_issue_proposal(response)
 
 
 def apply_issue(
@@ -107,7 +108,7 @@ def apply_issue(
     Raises:
         Exception: If OpenHands issue application fails
     """
-    prompt_retriever = PromptRetriever()
+    prompt_retriever = get_prompt_retriever()
     apply_issue_prompt = prompt_retriever.get_prompt(
         "apply-issue-openhands",
         issue_description=issue_description,
@@ -147,7 +148,7 @@ def fix_issue(
     Raises:
         Exception: If OpenHands issue fixing fails
     """
-    prompt_retriever = PromptRetriever()
+    prompt_retriever = get_prompt_retriever()
     fix_issue_prompt = prompt_retriever.get_prompt(
         "fix-issue-openhands",
         issue_description=issue_description,
@@ -192,13 +193,15 @@ def run_unit_tests(project_dir: Path, all_tasks: list[str]) -> bool:
                 print(f"Tests directory {tests_dir} does not exist")
             raise Exception(f"Test script {test_script} does not exist.")
 
-        result = subprocess.run(
-            ["bash", str(test_script)],
-            cwd=str(project_dir),
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode == 0:
+        # Only the exit status is used, so the output is discarded instead of captured
+        returncode = run_test_command(["bash", str(test_script)], project_dir)
+        if returncode is None:
+            print(
+                f"\033[91m[Timeout] Unit test for task {task} timed out after "
+                f"{UNIT_TEST_TIMEOUT} seconds.\033[0m"
+            )
+            return False
+        if returncode == 0:
             print(f"Unit test for task {task} successfully executed and passed.")
         else:
             print(f"Unit test failed for task {task}.")
@@ -207,59 +210,21 @@ def run_unit_tests(project_dir: Path, all_tasks: list[str]) -> bool:
     return True
 
 
-def main(repo_path: str, runtime_folder: str) -> None:
+def main(
+    repo_path: str, runtime_folder: str, max_workers: int = 1, use_cache: bool = False
+) -> None:
     project_dir = Path(repo_path)
     runtime_dir = Path(runtime_folder)
 
-    with open(project_dir / "tasks.json", "r") as f:
-        task = json.load(f)
+    task = load_json(project_dir / "tasks.json")
     project_name = task["project_name"]
     project_description = task["project_description"]
 
-    unit_tests_by_task = {}  # Dictionary to group tests by task number
-
-    for phase in task["phases"]:
-        for module in phase.get("modules", []):
-            for task_item in module.get("tasks", []):
-                task_number = task_item.get("task_number")
-                unit_tests = task_item.get("unit_tests", {})
-                code_tests = unit_tests.get("code_tests", [])
-                visual_tests = unit_tests.get("visual_tests", [])
-
-                # Only process tasks that have actual tests
-                if code_tests or visual_tests:
-                    # Combine all tests for this task X.Y.Z
-                    all_tests_for_task = []
-                    for test in code_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "code",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-                    for test in visual_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "visual",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
+    unit_tests_by_task = build_unit_tests_index(task)
 
-                    unit_tests_by_task[task_number] = {
-                        "task_number": task_number,
-                        "task_title": task_item.get("title"),
-                        "task_description": task_item.get("description"),
-                        "phase_number": phase.get("phase_number"),
-                        "module_number": module.get("module_number"),
-                        "all_tests": all_tests_for_task,
-                        "total_tests": len(all_tests_for_task),
-                    }
-
-    all_tasks: list[str] = []
-    tasks_cnt = 0
-    # Then iterate over each task to fix
+    # Collect the tasks to process up front, so the issue of the next task can be proposed
+    # while OpenHands works on the current one
+    tasks_to_process: list[tuple[str, dict]] = []
     for task_number, task_data in unit_tests_by_task.items():
         check_path_fix = runtime_dir / "converted_data" / f"{task_number}_fix.json"
         if check_path_fix.exists():
@@ -273,9 +238,34 @@ def main(repo_path: str, runtime_folder: str) -> None:
         if not check_path_implementation.exists() or not check_path_unit_test.exists():
             break
 
-        # First visit the current task when running unit tests
-        all_tasks.insert(0, task_number)
+        tasks_to_process.append((task_number, task_data))
+
+    def propose_task_issue(
+        task_number: str, task_data: dict, use_cache: bool = False
+    ) -> tuple[str, str]:
+        """Propose an issue for a task, based on its ground truth implementation."""
+        gt_implementation_dir = runtime_dir / f"{project_name}_{task_number}_implementation"
+        return propose_issue(
+            task_data,
+            project_description,
+            gt_implementation_dir,
+            task_number,
+            use_cache=use_cache,
+        )
+
+    def process_task(
+        task_number: str, task_data: dict, proposal: Future[tuple[str, str]] | None
+    ) -> bool:
+        """Propose, apply and fix issues of a task until a fix passes its unit tests.
 
+        Args:
+            task_number: The task number (e.g., "1.2.3")
+            task_data: Dictionary containing task information
+            proposal: The issue of the first trial if already requested, otherwise None
+
+        Returns:
+            True if an issue of the task was fixed, False otherwise
+        """
         print(f"\nRunning pipeline for task {task_number}...")
 
         iter_cnt = 1
@@ -284,17 +274,22 @@ def main(repo_path: str, runtime_folder: str) -> None:
         while iter_cnt <= max_retries:
             print(f"Trial {iter_cnt} for task {task_number}...")
 
-            # Propose issue
+            # Propose issue, the first one was already requested in the background
             gt_implementation_dir = runtime_dir / f"{project_name}_{task_number}_implementation"
-            issue, description = propose_issue(
-                task_data, project_description, gt_implementation_dir, task_number
-            )
+            if proposal is not None:
+                issue, description = proposal.result()
+                proposal = None
+            else:
+                # A retry needs a different issue, so only the first one may come from the cache
+                issue, description = propose_task_issue(
+                    task_number, task_data, use_cache=use_cache and iter_cnt == 1
+                )
 
             # Apply issue to create buggy version
             issue_dir = runtime_dir / f"{project_name}_{task_number}_issue"
             if issue_dir.exists():
                 shutil.rmtree(issue_dir)
-            shutil.copytree(gt_implementation_dir, issue_dir)
+            clone_tree(gt_implementation_dir, issue_dir)
             apply_issue(issue, issue_dir, project_description, task_data, task_number)
 
             # Verify that issue was successfully applied by running tests (they should fail)
@@ -313,7 +308,7 @@ def main(repo_path: str, runtime_folder: str) -> None:
                 fix_dir_openhands = runtime_dir / f"{project_name}_{task_number}_fix"
                 if fix_dir.exists():
                     shutil.rmtree(fix_dir)
-                shutil.copytree(issue_dir, fix_dir)
+                clone_tree(issue_dir, fix_dir)
                 log_dir = runtime_dir / f"log_{task_number}_fix"
 
                 # Remove the tests directory from fix_dir before running fix_issue
@@ -327,7 +322,7 @@ def main(repo_path: str, runtime_folder: str) -> None:
                 fix_tests_dir = fix_dir / "tests"
                 if fix_tests_dir.exists():
                     shutil.rmtree(fix_tests_dir)
-                shutil.copytree(issue_dir / "tests", fix_dir / "tests")
+                clone_tree(issue_dir / "tests", fix_dir / "tests")
 
                 # Validate that the fix worked
                 print(f"Validating fix for task {task_number}...")
@@ -338,7 +333,7 @@ def main(repo_path: str, runtime_folder: str) -> None:
                         f"🎉 Issue successfully fixed for task {task_number} - all tests now pass!"
                     )
                     convert_data(str(runtime_dir), str(log_dir), task_number, "fix")
-                    tasks_cnt += 1
+                    return True
                 else:
                     print(f"⚠️  Fix attempt failed for task {task_number} - tests still failing")
                     if iter_cnt >= max_retries:
@@ -359,6 +354,37 @@ def main(repo_path: str, runtime_folder: str) -> None:
                     break
                 iter_cnt += 1
 
+        return False
+
+    tasks_cnt = 0
+    if max_workers == 1:
+        # The first issue of a task only depends on its ground truth implementation, so it is
+        # proposed in the background during the previous task
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_proposal = (
+                executor.submit(propose_task_issue, *tasks_to_process[0], use_cache)
+                if tasks_to_process
+                else None
+            )
+            # Then iterate over each task to fix
+            for index, (task_number, task_data) in enumerate(tasks_to_process):
+                proposal = next_proposal
+                if index + 1 < len(tasks_to_process):
+                    next_proposal = executor.submit(
+                        propose_task_issue, *tasks_to_process[index + 1], use_cache
+                    )
+                if process_task(task_number, task_data, proposal):
+                    tasks_cnt += 1
+    else:
+        # Each task works on its own copies of its ground truth implementation, so the tasks
+        # are independent of each other and can run concurrently
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(process_task, task_number, task_data, None)
+                for task_number, task_data in tasks_to_process
+            ]
+            tasks_cnt = sum(future.result() for future in futures)
+
     print(f"SWE-bench pipeline completed successfully. Totally {tasks_cnt} tasks finished.")
 
 
@@ -387,6 +413,24 @@ Examples:
         help="The folder to save the runtime data",
     )
 
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Maximum number of tasks processed at the same time (default: 1)",
+    )
+
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help="Reuse the first proposed issue of each task from an earlier run",
+    )
+
     args = parser.parse_args()
 
-    main(args.repo_path, args.runtime_folder)
+    main(
+        args.repo_path,
+        args.runtime_folder,
+        max_workers=args.max_workers,
+        use_cache=args.use_cache,
+    )
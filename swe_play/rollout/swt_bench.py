@@ -1,16 +1,21 @@
 """Rollout pipeline for SWT-Bench specific generation."""
 
 import argparse
-import json
-import re
+import os
 import shutil
-import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from swe_play.utils.call_openhands import call_openhands_rollout
+from swe_play.utils.clone_tree import clone_tree
 from swe_play.utils.convert_data import convert_data
-from swe_play.utils.llm_client import create_llm_client
-from swe_play.utils.prompt_retriever import PromptRetriever
+from swe_play.utils.issue_parser import parse_issue_proposal
+from swe_play.utils.json_utils import load_json
+from swe_play.utils.llm_client import get_llm_client
+from swe_play.utils.prompt_retriever import get_prompt_retriever
+from swe_play.utils.run_tests import UNIT_TEST_TIMEOUT, read_output_tail, run_test_command
+from swe_play.utils.task_loader import build_unit_tests_index, clean_task_title
 
 
 def propose_issue(
@@ -39,21 +44,23 @@ def propose_issue(
     """
     unit_tests_dir = project_dir / "tests"
 
-    test_prompt = f"Task {task_number}: {task_data['total_tests']} total tests\n"
-    for test in task_data["all_tests"]:
-        test_prompt += f"  - {test['type']}: {test['name']}\n"
-    with open(unit_tests_dir / f"{task_number}.md", "r") as f:
-        test_prompt += f"The detailed unit tests proposal:\n\n{f.read()}"
+    test_prompt_parts = [f"Task {task_number}: {task_data['total_tests']} total tests\n"]
+    test_prompt_parts.extend(
+        f"  - {test['type']}: {test['name']}\n" for test in task_data["all_tests"]
+    )
+    unit_tests_proposal = (unit_tests_dir / f"{task_number}.md").read_text(encoding="utf-8")
+    test_prompt_parts.append(f"The detailed unit tests proposal:\n\n{unit_tests_proposal}")
+    test_prompt = "".join(test_prompt_parts)
 
     task_number = task_number.replace(".", "_")
     code_file = project_dir / "tests" / f"test_{task_number}.py"
-    if not code_file.exists():
+    try:
+        test_code = code_file.read_text(encoding="utf-8")
+    except FileNotFoundError:
         raise Exception(f"Code file {code_file} does not exist")
-    with open(code_file, "r") as f:
-        test_code = f.read()
 
-    llm_client = create_llm_client(model=model)
-    prompt_retriever = PromptRetriever()
+    llm_client = get_llm_client(model)
+    prompt_retriever = get_prompt_retriever()
 
     system_prompt = prompt_retriever.get_prompt("propose-issue-system")
     user_prompt = prompt_retriever.get_prompt(
@@ -64,25 +71,15 @@ def propose_issue(
     )
 
     print("Calling LLM to propose issues in SWT-Bench format...")
+    # The prompts are the same for every trial of a task, so Claude caches all of them
     response = llm_client.system_completion(
-        system_prompt=system_prompt, user_prompt=user_prompt, temperature=0.7
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        temperature=0.7,
+        cache_prefix=user_prompt if "claude" in model.lower() else None,
     )
 
-    # Extract technical issue for applying bug
-    issue_pattern = r"<issue>(.*?)</issue>"
-    issue_matches = re.findall(issue_pattern, response, re.DOTALL)
-
-    # Extract user-friendly description for fixing bug
-    description_pattern = r"<description>(.*?)</description>"
-    description_matches = re.findall(description_pattern, response, re.DOTALL)
-
-    if not issue_matches or not description_matches:
-        raise Exception("LLM response missing required <issue> or <description> tags")
-
-    technical_issue = issue_matches[0].strip()
-    user_description = description_matches[0].strip()
-
-    return technical_issue, user_description
+    return parse_issue_proposal(response)
 
 
 def cleanup_test_files(project_dir: Path, all_task_data: dict) -> None:
@@ -99,40 +96,44 @@ def cleanup_test_files(project_dir: Path, all_task_data: dict) -> None:
 
     print(f"Cleaning up test files for all tasks in {tests_dir}")
 
+    # List the directory once, so existence and name conflicts are checked in memory
+    existing_files = {entry.name for entry in os.scandir(tests_dir)}
+    # Renames are reported together at the end, in a single write
+    renamed_lines: list[str] = []
+
     for task_number, task_data in all_task_data.items():
         task_title = task_data.get("task_title", "")
 
         # Convert task_number format for file operations (replace dots with underscores)
         task_number_file = task_number.replace(".", "_")
 
-        # Remove bash test script
-        bash_script = tests_dir / f"{task_number}.sh"
-        if bash_script.exists():
-            bash_script.unlink()
-
-        # Remove bash test script
-        markdown_script = tests_dir / f"{task_number}.md"
-        if markdown_script.exists():
-            markdown_script.unlink()
+        # Remove bash test script and unit tests proposal
+        for script_name in (f"{task_number}.sh", f"{task_number}.md"):
+            (tests_dir / script_name).unlink(missing_ok=True)
+            existing_files.discard(script_name)
 
         # Rename Python test file using task title (without "test_" prefix)
         python_test_file = tests_dir / f"test_{task_number_file}.py"
-        if python_test_file.exists() and task_title:
-            # Clean task title; drop special chars and replace whitespace
-            clean_title = re.sub(r"[^\w\s-]", "", task_title).strip()
-            clean_title = re.sub(r"[-\s]+", "_", clean_title).lower()
+        if python_test_file.name in existing_files and task_title:
+            clean_title = clean_task_title(task_title)
             new_python_file = tests_dir / f"{clean_title}.py"
 
             # Avoid name conflicts
             counter = 1
-            while new_python_file.exists() and new_python_file != python_test_file:
+            while new_python_file.name in existing_files and new_python_file != python_test_file:
                 new_python_file = tests_dir / f"{clean_title}_{counter}.py"
                 counter += 1
 
             if new_python_file != python_test_file:
                 python_test_file.rename(new_python_file)
-                print(f"Renamed Python test file: {python_test_file} -> {new_python_file}")
+                existing_files.discard(python_test_file.name)
+                existing_files.add(new_python_file.name)
+                renamed_lines.append(
+                    f"Renamed Python test file: {python_test_file} -> {new_python_file}"
+                )
 
+    if renamed_lines:
+        print("\n".join(renamed_lines))
     print("Completed test file cleanup for all tasks")
 
 
@@ -160,7 +161,7 @@ def apply_issue(
     Raises:
         Exception: If OpenHands issue application fails
     """
-    prompt_retriever = PromptRetriever()
+    prompt_retriever = get_prompt_retriever()
     apply_issue_prompt = prompt_retriever.get_prompt(
         "apply-issue-swt-openhands",
         issue_description=issue_description,
@@ -204,7 +205,7 @@ def reproduce_issue(
     Raises:
         Exception: If OpenHands issue reproducing fails
     """
-    prompt_retriever = PromptRetriever()
+    prompt_retriever = get_prompt_retriever()
     reproduce_issue_prompt = prompt_retriever.get_prompt(
         "reproduce-issue-openhands",
         issue_description=issue_description,
@@ -269,20 +270,29 @@ def run_unit_tests(project_dir: Path, all_tasks: list[str]) -> bool:
         print(f"Running test file: {test_file.name}")
 
         # Run the Python test file using pytest
-        result = subprocess.run(
-            ["python", "-m", "pytest", str(test_file), "-v"],
-            cwd=str(project_dir),
-            capture_output=True,
-            text=True,
-        )
+        # The output is written to temporary files rather than held in memory, and only its
+        # tail is printed if the test fails
+        with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+            returncode = run_test_command(
+                ["python", "-m", "pytest", str(test_file), "-v"],
+                project_dir,
+                stdout=stdout,
+                stderr=stderr,
+            )
+            if returncode is None:
+                print(
+                    f"\033[91m[Timeout] Test file {test_file.name} timed out after "
+                    f"{UNIT_TEST_TIMEOUT} seconds.\033[0m"
+                )
+                return False
 
-        if result.returncode == 0:
-            print(f"✅ Test file {test_file.name} passed successfully.")
-        else:
-            print(f"❌ Test file {test_file.name} failed.")
-            print(f"Test output: {result.stdout}")
-            print(f"Test errors: {result.stderr}")
-            return False
+            if returncode == 0:
+                print(f"✅ Test file {test_file.name} passed successfully.")
+            else:
+                print(f"❌ Test file {test_file.name} failed.")
+                print(f"Test output: {read_output_tail(stdout)}")
+                print(f"Test errors: {read_output_tail(stderr)}")
+                return False
 
     return True
 
@@ -291,55 +301,15 @@ def main(repo_path: str, runtime_folder: str) -> None:
     project_dir = Path(repo_path)
     runtime_dir = Path(runtime_folder)
 
-    with open(project_dir / "tasks.json", "r") as f:
-        task = json.load(f)
+    task = load_json(project_dir / "tasks.json")
     project_name = task["project_name"]
     project_description = task["project_description"]
 
-    unit_tests_by_task = {}  # Dictionary to group tests by task number
-
-    for phase in task["phases"]:
-        for module in phase.get("modules", []):
-            for task_item in module.get("tasks", []):
-                task_number = task_item.get("task_number")
-                unit_tests = task_item.get("unit_tests", {})
-                code_tests = unit_tests.get("code_tests", [])
-                visual_tests = unit_tests.get("visual_tests", [])
-
-                # Only process tasks that have actual tests
-                if code_tests or visual_tests:
-                    # Combine all tests for this task X.Y.Z
-                    all_tests_for_task = []
-                    for test in code_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "code",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-                    for test in visual_tests:
-                        all_tests_for_task.append(
-                            {
-                                "type": "visual",
-                                "name": test.get("name"),
-                                "description": test.get("description"),
-                            }
-                        )
-
-                    unit_tests_by_task[task_number] = {
-                        "task_number": task_number,
-                        "task_title": task_item.get("title"),
-                        "task_description": task_item.get("description"),
-                        "phase_number": phase.get("phase_number"),
-                        "module_number": module.get("module_number"),
-                        "all_tests": all_tests_for_task,
-                        "total_tests": len(all_tests_for_task),
-                    }
+    unit_tests_by_task = build_unit_tests_index(task)
 
-    all_tasks: list[str] = []
-    tasks_cnt = 0
-    # Then iterate over each task to reproduce
+    # Collect the tasks to process up front, so the issue of the next task can be proposed
+    # while OpenHands works on the current one
+    tasks_to_process: list[tuple[str, dict]] = []
     for task_number, task_data in unit_tests_by_task.items():
         check_path_fix = runtime_dir / "converted_data" / f"{task_number}_reproduce.json"
         if check_path_fix.exists():
@@ -353,72 +323,114 @@ def main(repo_path: str, runtime_folder: str) -> None:
         if not check_path_implementation.exists() or not check_path_unit_test.exists():
             break
 
-        # First visit the current task when running unit tests
-        all_tasks.insert(0, task_number)
+        tasks_to_process.append((task_number, task_data))
 
-        print(f"\nRunning pipeline for task {task_number}...")
+    def propose_task_issue(task_number: str, task_data: dict) -> tuple[str, str]:
+        """Propose an issue for a task, based on its ground truth implementation."""
+        gt_implementation_dir = runtime_dir / f"{project_name}_{task_number}_implementation"
+        return propose_issue(task_data, project_description, gt_implementation_dir, task_number)
 
-        iter_cnt = 1
-        max_retries = 3
+    all_tasks: list[str] = []
+    tasks_cnt = 0
+    # The first issue of a task only depends on its ground truth implementation, so it is
+    # proposed in the background during the previous task
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        next_proposal = (
+            executor.submit(propose_task_issue, *tasks_to_process[0]) if tasks_to_process else None
+        )
+        # Then iterate over each task to reproduce
+        for index, (task_number, task_data) in enumerate(tasks_to_process):
+            proposal = next_proposal
+            if index + 1 < len(tasks_to_process):
+                next_proposal = executor.submit(propose_task_issue, *tasks_to_process[index + 1])
 
-        while iter_cnt <= max_retries:
-            print(f"Trial {iter_cnt} for task {task_number}...")
+            # First visit the current task when running unit tests
+            all_tasks.insert(0, task_number)
 
-            # Propose issue
-            gt_implementation_dir = runtime_dir / f"{project_name}_{task_number}_implementation"
+            print(f"\nRunning pipeline for task {task_number}...")
 
-            issue, description = propose_issue(
-                task_data, project_description, gt_implementation_dir, task_number
-            )
+            iter_cnt = 1
+            max_retries = 3
 
-            # Apply issue to create buggy version
-            issue_dir = runtime_dir / f"{project_name}_{task_number}_issue_swt"
-            if issue_dir.exists():
-                shutil.rmtree(issue_dir)
-            shutil.copytree(gt_implementation_dir, issue_dir)
+            while iter_cnt <= max_retries:
+                print(f"Trial {iter_cnt} for task {task_number}...")
 
-            apply_issue(
-                issue, issue_dir, project_description, task_data, task_number, unit_tests_by_task
-            )
+                # Propose issue, the first one was already requested in the background
+                gt_implementation_dir = runtime_dir / f"{project_name}_{task_number}_implementation"
+                if proposal is not None:
+                    issue, description = proposal.result()
+                    proposal = None
+                else:
+                    issue, description = propose_task_issue(task_number, task_data)
+
+                # Apply issue to create buggy version
+                issue_dir = runtime_dir / f"{project_name}_{task_number}_issue_swt"
+                if issue_dir.exists():
+                    shutil.rmtree(issue_dir)
+                clone_tree(gt_implementation_dir, issue_dir)
+
+                apply_issue(
+                    issue,
+                    issue_dir,
+                    project_description,
+                    task_data,
+                    task_number,
+                    unit_tests_by_task,
+                )
 
-            # Verify that issue was successfully applied by running tests (they should fail)
-            print(f"Verifying issue application for task {task_number}...")
-            tests_pass = run_unit_tests(issue_dir, [task_number])
+                # Verify that issue was successfully applied by running tests (they should fail)
+                print(f"Verifying issue application for task {task_number}...")
+                tests_pass = run_unit_tests(issue_dir, [task_number])
 
-            if tests_pass:
-                print(
-                    "✅ Issue successfully applied for task "
-                    f"{task_number} - tests are now still passing"
-                )
+                if tests_pass:
+                    print(
+                        "✅ Issue successfully applied for task "
+                        f"{task_number} - tests are now still passing"
+                    )
 
-                # Now attempt to fix the issue using OpenHands
-                print(f"Attempting to reproduce issue for task {task_number}...")
-                reproduce_dir = (
-                    runtime_dir / f"{project_name}_{task_number}_reproduce" / f"{project_name}"
-                )
-                reproduce_dir_openhands = runtime_dir / f"{project_name}_{task_number}_reproduce"
-                if reproduce_dir.exists():
-                    shutil.rmtree(reproduce_dir)
-                shutil.copytree(issue_dir, reproduce_dir)
-                log_dir = runtime_dir / f"log_{task_number}_reproduce"
+                    # Now attempt to fix the issue using OpenHands
+                    print(f"Attempting to reproduce issue for task {task_number}...")
+                    reproduce_dir = (
+                        runtime_dir / f"{project_name}_{task_number}_reproduce" / f"{project_name}"
+                    )
+                    reproduce_dir_openhands = (
+                        runtime_dir / f"{project_name}_{task_number}_reproduce"
+                    )
+                    if reproduce_dir.exists():
+                        shutil.rmtree(reproduce_dir)
+                    clone_tree(issue_dir, reproduce_dir)
+                    log_dir = runtime_dir / f"log_{task_number}_reproduce"
 
-                reproduce_issue(description, project_name, reproduce_dir_openhands, log_dir)
+                    reproduce_issue(description, project_name, reproduce_dir_openhands, log_dir)
 
-                # Validate that the fix worked
-                print(f"Validating reproduce for task {task_number}...")
-                reproduce_tests_pass = run_unit_tests(reproduce_dir, [task_number])
+                    # Validate that the fix worked
+                    print(f"Validating reproduce for task {task_number}...")
+                    reproduce_tests_pass = run_unit_tests(reproduce_dir, [task_number])
 
-                if not reproduce_tests_pass:
-                    print(
-                        "🎉 Issue successfully reproduced for task "
-                        f"{task_number} - some tests failed!"
-                    )
-                    convert_data(str(runtime_dir), str(log_dir), task_number, "reproduce")
-                    tasks_cnt += 1
+                    if not reproduce_tests_pass:
+                        print(
+                            "🎉 Issue successfully reproduced for task "
+                            f"{task_number} - some tests failed!"
+                        )
+                        convert_data(str(runtime_dir), str(log_dir), task_number, "reproduce")
+                        tasks_cnt += 1
+                    else:
+                        print(
+                            "⚠️  Reproduce attempt failed for task "
+                            f"{task_number} - tests still passing"
+                        )
+                        if iter_cnt >= max_retries:
+                            print(
+                                "⚠️  Maximum retries reached for task "
+                                f"{task_number}. Skipping this task."
+                            )
+                            break
+                        iter_cnt += 1
+                    break
                 else:
                     print(
-                        "⚠️  Reproduce attempt failed for task "
-                        f"{task_number} - tests still passing"
+                        "❌ Issue application failed for task "
+                        f"{task_number} - tests still pass (trial {iter_cnt}/{max_retries})"
                     )
                     if iter_cnt >= max_retries:
                         print(
@@ -427,16 +439,6 @@ def main(repo_path: str, runtime_folder: str) -> None:
                         )
                         break
                     iter_cnt += 1
-                break
-            else:
-                print(
-                    "❌ Issue application failed for task "
-                    f"{task_number} - tests still pass (trial {iter_cnt}/{max_retries})"
-                )
-                if iter_cnt >= max_retries:
-                    print(f"⚠️  Maximum retries reached for task {task_number}. Skipping this task.")
-                    break
-                iter_cnt += 1
 
     print(f"SWT-Bench pipeline completed successfully. Totally {tasks_cnt} tasks finished.")
 
@@ -1,14 +1,49 @@
 """Utility modules for SWE Playground."""
 
-from .call_openhands import call_openhands, call_openhands_raw
-from .llm_client import LLMClient, create_llm_client
-from .prompt_retriever import PromptRetriever, get_prompt
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .call_openhands import call_openhands, call_openhands_raw
+    from .llm_cache import LLMCache, cached_system_completion, get_llm_cache
+    from .llm_client import LLMClient, create_llm_client, get_llm_client
+    from .prompt_retriever import PromptRetriever, get_prompt, get_prompt_retriever
+
+# The submodule each re-exported name is defined in
+# Importing them lazily keeps the LLM client library from loading with every submodule
+_EXPORTS = {
+    "PromptRetriever": "prompt_retriever",
+    "get_prompt": "prompt_retriever",
+    "get_prompt_retriever": "prompt_retriever",
+    "LLMClient": "llm_client",
+    "create_llm_client": "llm_client",
+    "get_llm_client": "llm_client",
+    "LLMCache": "llm_cache",
+    "get_llm_cache": "llm_cache",
+    "cached_system_completion": "llm_cache",
+    "call_openhands": "call_openhands",
+    "call_openhands_raw": "call_openhands",
+}
 
 __all__ = [
     "PromptRetriever",
     "get_prompt",
+    "get_prompt_retriever",
     "LLMClient",
     "create_llm_client",
+    "get_llm_client",
+    "LLMCache",
+    "get_llm_cache",
+    "cached_system_completion",
     "call_openhands",
     "call_openhands_raw",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    """Import a re-exported name from its submodule on first access."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
@@ -1,9 +1,58 @@
 """Utility for calling OpenHands agent."""
 
+import functools
 import os
+import random
 import re
+import shutil
 import subprocess
-from typing import Any
+import tempfile
+import time
+from typing import Any, TextIO
+
+from swe_play.utils.clone_tree import clone_tree
+
+# Number of trailing bytes of a logged OpenHands output returned to the caller
+OUTPUT_TAIL_BYTES = 4000
+
+# Number of attempts of a rollout call before its OpenHands failure is raised
+OPENHANDS_MAX_ATTEMPTS = 3
+
+# Upper bound in seconds of the random delay before the first retry, doubled for every later one
+OPENHANDS_BACKOFF_BASE = 30
+
+# Folders of the output directory OpenHands writes the trajectories and completions of a call to
+OPENHANDS_OUTPUT_FOLDERS = ("trajectories", "log_completions")
+
+
+@functools.cache
+def get_openhands_python(openhands_dir: str) -> list[str]:
+    """Get the command prefix running the Python interpreter of the OpenHands environment.
+
+    The interpreter of the poetry environment is resolved once per OpenHands directory, so
+    every call does not pay for poetry starting up and locating the environment again.
+
+    Args:
+        openhands_dir: Path to the OpenHands repository.
+
+    Returns:
+        The command prefix, falling back to `poetry run python` if the environment cannot
+        be resolved.
+    """
+    try:
+        result = subprocess.run(
+            ["poetry", "env", "info", "--executable"],
+            cwd=openhands_dir,
+            text=True,
+            capture_output=True,
+            check=True,
+        )
+        executable = result.stdout.strip()
+        if executable and os.path.isfile(executable):
+            return [executable]
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return ["poetry", "run", "python"]
 
 
 def call_openhands_raw(
@@ -11,6 +60,7 @@ def call_openhands_raw(
     config_file_path: str | None = None,
     directory: str | None = None,
     output_dir: str | None = None,
+    log_file: str | None = None,
     **kwargs: Any,
 ) -> subprocess.CompletedProcess[str]:
     """Call the OpenHands agent with a given prompt and configuration and return the raw
@@ -20,6 +70,8 @@ def call_openhands_raw(
         prompt: The task prompt to send to the OpenHands agent.
         config_file_path: Path to the config file. If None, will use OPENHANDS_CONFIG_PATH env var.
         directory: Working directory for the OpenHands agent. If provided, adds -d flag.
+        log_file: If provided, stdout and stderr are appended to this file instead of being
+            captured, and the result carries no output.
         **kwargs: Additional arguments to pass to subprocess.run().
 
     Returns:
@@ -38,13 +90,12 @@ def call_openhands_raw(
                 "or pass config_file_path parameter."
             )
 
-    # Change working directory to the repo of OpenHands
-    current_cwd = os.getcwd()
-    openhands_dir = os.path.dirname(config_file_path)
-    os.chdir(openhands_dir)
+    # Run OpenHands from its own repo, passed to the subprocess so the process-wide working
+    # directory is left alone and concurrent calls do not interfere
+    openhands_dir = os.path.dirname(os.path.abspath(config_file_path))
 
     # Cannot pass working space to OpenHands via arguments
-    # Hence directly modify the config file to set workspace_base
+    # Hence write a copy of the config file with workspace_base set, private to this call
     with open(config_file_path, "r") as f:
         config_content = f.read()
         # Use regex to find and replace workspace_base regardless of the original value
@@ -75,20 +126,23 @@ def call_openhands_raw(
                 config_content,
             )
 
-    with open(config_file_path, "w") as f:
+    # Kept next to the original, so relative paths in the config resolve the same way
+    fd, call_config_file_path = tempfile.mkstemp(
+        prefix=".openhands-", suffix=".toml", dir=openhands_dir
+    )
+    with os.fdopen(fd, "w") as f:
         f.write(config_content)
 
     # Build the command
+    python = get_openhands_python(openhands_dir)
     cmd = [
-        "poetry",
-        "run",
-        "python",
+        *python,
         "-m",
         "openhands.core.main",
         "-t",
         prompt,
         "--config-file",
-        config_file_path,
+        call_config_file_path,
     ]
 
     # # Add directory flag if provided
@@ -97,14 +151,31 @@ def call_openhands_raw(
 
     # Set default kwargs
     default_kwargs: dict[str, Any] = {
+        "cwd": openhands_dir,
         "text": True,
         "capture_output": True,
         "check": True,
     }
+    if len(python) == 1:
+        # Run the interpreter as if its environment were activated, like `poetry run` does, so
+        # the tools installed in it are found and subprocesses use the same environment
+        bin_dir = os.path.dirname(python[0])
+        default_kwargs["env"] = {
+            **os.environ,
+            "VIRTUAL_ENV": os.path.dirname(bin_dir),
+            "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        }
     default_kwargs.update(kwargs)
 
     # Execute the command
+    log: TextIO | None = None
     try:
+        if log_file is not None:
+            # Stream the output to the log file, so it is never held in memory
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            log = open(log_file, "a")
+            default_kwargs.update(capture_output=False, stdout=log, stderr=subprocess.STDOUT)
+
         try:
             result = subprocess.run(cmd, timeout=1200, **default_kwargs)
 
@@ -124,12 +195,16 @@ def call_openhands_raw(
             print(f"\n[STDOUT]\n{e.stdout}")
         if e.stderr:
             print(f"\n[STDERR]\n{e.stderr}")
+        if log_file is not None:
+            print(f"\n[OUTPUT]\nSaved to {log_file}")
         raise subprocess.CalledProcessError(
             e.returncode, e.cmd, output=e.stdout, stderr=e.stderr
         ) from e
     finally:
-        # Always restore original working directory
-        os.chdir(current_cwd)
+        # Always remove the config file of this call
+        os.remove(call_config_file_path)
+        if log is not None:
+            log.close()
 
 
 def call_openhands(
@@ -154,6 +229,40 @@ def call_openhands(
     return result.stdout
 
 
+def snapshot_trees(paths: list[str], snapshot_dir: str) -> list[tuple[str, str | None]]:
+    """Clone directory trees, so they can be restored to their current state.
+
+    Args:
+        paths: The directories to snapshot. Those that do not exist are restored as missing.
+        snapshot_dir: An empty directory to clone the trees into.
+
+    Returns:
+        The pairs of each directory and its clone, or None if it did not exist, to pass to
+        `restore_trees`.
+    """
+    snapshots: list[tuple[str, str | None]] = []
+    for i, path in enumerate(paths):
+        if os.path.isdir(path):
+            snapshot = os.path.join(snapshot_dir, str(i))
+            clone_tree(path, snapshot)
+            snapshots.append((path, snapshot))
+        else:
+            snapshots.append((path, None))
+    return snapshots
+
+
+def restore_trees(snapshots: list[tuple[str, str | None]]) -> None:
+    """Restore directory trees to the state saved by `snapshot_trees`.
+
+    Args:
+        snapshots: The pairs returned by `snapshot_trees`.
+    """
+    for path, snapshot in snapshots:
+        shutil.rmtree(path, ignore_errors=True)
+        if snapshot is not None:
+            clone_tree(snapshot, path)
+
+
 def call_openhands_rollout(
     prompt: str,
     config_file_path: str | None = None,
@@ -162,18 +271,67 @@ def call_openhands_rollout(
 ) -> str:
     """Call OpenHands agent and return just the stdout output.
 
+    If an output directory is given, the full output is appended to `openhands.log` in it
+    rather than held in memory, and only its last OUTPUT_TAIL_BYTES are returned.
+
+    A call whose OpenHands process fails, e.g. because of a transient LLM or runtime error,
+    is retried up to OPENHANDS_MAX_ATTEMPTS times in total, after a full-jitter exponential
+    backoff. The working directory and the trajectories and completions folders are restored
+    before every retry, so each attempt starts from the same tree as the first one.
+
     Args:
         prompt: The task prompt to send to the OpenHands agent.
         config_file_path: Path to the config file. If None, will use OPENHANDS_CONFIG_PATH env var.
         directory: Working directory for the OpenHands agent. If provided, adds -d flag.
+        output_dir: Directory to save the trajectories, completions and output of the agent.
 
     Returns:
-        The stdout output from the OpenHands command.
+        The stdout output from the OpenHands command, or the tail of it if it was logged.
 
     Raises:
         ValueError: If no config file path is provided and OPENHANDS_CONFIG_PATH env var is not set.
-        subprocess.CalledProcessError: If the OpenHands command fails.
+        subprocess.CalledProcessError: If the OpenHands command fails on every attempt.
     """
     print("Repo directory:", directory)
-    result = call_openhands_raw(prompt, config_file_path, directory, output_dir)
-    return result.stdout
+    log_file = None if output_dir is None else os.path.join(output_dir, "openhands.log")
+
+    # The trees an attempt writes to, other than the log which keeps the output of every attempt
+    attempt_trees = [] if directory is None else [os.path.abspath(directory)]
+    if output_dir is not None:
+        attempt_trees += [
+            os.path.join(os.path.abspath(output_dir), folder) for folder in OPENHANDS_OUTPUT_FOLDERS
+        ]
+    # Next to the first tree, so it is cloned within the same filesystem
+    snapshot_dir = tempfile.mkdtemp(
+        prefix=".openhands-snapshot-",
+        dir=os.path.dirname(attempt_trees[0]) if attempt_trees else None,
+    )
+    try:
+        snapshots = snapshot_trees(attempt_trees, snapshot_dir)
+        for attempt in range(1, OPENHANDS_MAX_ATTEMPTS + 1):
+            try:
+                result = call_openhands_raw(
+                    prompt, config_file_path, directory, output_dir, log_file=log_file
+                )
+                break
+            except subprocess.CalledProcessError as e:
+                if attempt == OPENHANDS_MAX_ATTEMPTS:
+                    raise
+                # Full jitter, so concurrent calls failing together do not retry in lockstep
+                delay = random.uniform(0, OPENHANDS_BACKOFF_BASE * 2 ** (attempt - 1))
+                print(
+                    f"OpenHands attempt {attempt}/{OPENHANDS_MAX_ATTEMPTS} failed, retrying in "
+                    f"{delay:.1f} seconds: {e}"
+                )
+                restore_trees(snapshots)
+                time.sleep(delay)
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    if log_file is None:
+        return result.stdout
+
+    with open(log_file, "rb") as f:
+        f.seek(max(os.fstat(f.fileno()).st_size - OUTPUT_TAIL_BYTES, 0))
+        tail = f.read().decode("utf-8", errors="replace")
+    return f"[Full output in {log_file}]\n{tail}"
@@ -0,0 +1,67 @@
+"""Utility for cloning directory trees."""
+
+import os
+import shutil
+import sys
+from collections.abc import Callable, Iterable
+
+if sys.platform == "linux":
+    import fcntl
+
+# ioctl request of FICLONE on Linux, which makes a file share the data blocks of another
+FICLONE = 0x40049409
+
+# Maximum number of bytes copied by a single copy_file_range call
+COPY_CHUNK_SIZE = 2**30
+
+
+def clone_tree(
+    src: str | os.PathLike[str],
+    dst: str | os.PathLike[str],
+    ignore: Callable[[str, list[str]], Iterable[str]] | None = None,
+) -> None:
+    """Recursively copy a directory tree, using reflinks where the filesystem supports them.
+
+    On copy-on-write filesystems (btrfs, XFS, ...) every file is cloned with FICLONE, so only
+    metadata is written and the data blocks are shared until either copy is modified.
+    Otherwise files are copied inside the kernel with `os.copy_file_range`, which also lets
+    network filesystems copy on the server side, and finally with `shutil.copy2`. Unlike
+    hardlinks, the clone is fully independent of the source, so it is safe to edit files of
+    either tree in place.
+
+    Args:
+        src: The directory to copy.
+        dst: The destination directory, which must not exist yet.
+        ignore: Same as the `ignore` argument of `shutil.copytree`.
+
+    Raises:
+        FileExistsError: If the destination directory already exists.
+        shutil.Error: If copying any of the files fails.
+    """
+    reflink_supported = sys.platform == "linux"
+    copy_file_range_supported = hasattr(os, "copy_file_range")
+
+    def copy_function(src_file: str, dst_file: str) -> str:
+        nonlocal reflink_supported, copy_file_range_supported
+        if reflink_supported:
+            try:
+                with open(src_file, "rb") as fsrc, open(dst_file, "wb") as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                shutil.copystat(src_file, dst_file)
+                return dst_file
+            except OSError:
+                # Typically the filesystem does not support reflinks, so stop trying
+                reflink_supported = False
+        if copy_file_range_supported:
+            try:
+                with open(src_file, "rb") as fsrc, open(dst_file, "wb") as fdst:
+                    while os.copy_file_range(fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE):
+                        pass
+                shutil.copystat(src_file, dst_file)
+                return dst_file
+            except OSError:
+                # Not supported by the kernel or across these filesystems, so stop trying
+                copy_file_range_supported = False
+        return str(shutil.copy2(src_file, dst_file))
+
+    shutil.copytree(src, dst, copy_function=copy_function, ignore=ignore)
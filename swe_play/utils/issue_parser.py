@@ -0,0 +1,35 @@
+"""Utility for parsing the issues proposed by the LLM for a task."""
+
+import re
+
+# Matches the technical issue used to apply the bug in an issue proposal
+ISSUE_PATTERN = re.compile(r"<issue>(.*?)</issue>", re.DOTALL)
+
+# Matches the user-friendly description used to fix the bug in an issue proposal
+DESCRIPTION_PATTERN = re.compile(r"<description>(.*?)</description>", re.DOTALL)
+
+
+def parse_issue_proposal(response: str) -> tuple[str, str]:
+    """Parse the technical issue and the user-friendly description out of an LLM response.
+
+    Only the first issue and description of the response are used.
+
+    Args:
+        response: The LLM response to the propose-issue prompts.
+
+    Returns:
+        Tuple of (technical_issue, user_description).
+
+    Raises:
+        Exception: If the response lacks an issue or a description.
+    """
+    # Extract technical issue for applying bug
+    issue_match = ISSUE_PATTERN.search(response)
+
+    # Extract user-friendly description for fixing bug
+    description_match = DESCRIPTION_PATTERN.search(response)
+
+    if issue_match is None or description_match is None:
+        raise Exception("LLM response missing required <issue> or <description> tags")
+
+    return issue_match.group(1).strip(), description_match.group(1).strip()
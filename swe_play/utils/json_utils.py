@@ -0,0 +1,45 @@
+"""JSON helpers that use orjson when it is installed."""
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup
+    orjson = None  # type: ignore[assignment]
+
+
+def load_json(path: str | os.PathLike[str]) -> Any:
+    """Load a JSON file.
+
+    Parses the raw bytes of the file with orjson if available, otherwise with the
+    standard library.
+
+    Args:
+        path: Path to the JSON file.
+
+    Returns:
+        The parsed JSON content.
+    """
+    data = Path(path).read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_json(obj: Any, path: str | os.PathLike[str]) -> None:
+    """Write an object to a JSON file as compact UTF-8.
+
+    Serializes with orjson if available, otherwise with the standard library.
+
+    Args:
+        obj: The object to serialize.
+        path: Path to the JSON file.
+    """
+    if orjson is not None:
+        data = orjson.dumps(obj)
+    else:
+        data = json.dumps(obj, ensure_ascii=False).encode()
+    Path(path).write_bytes(data)
@@ -0,0 +1,180 @@
+"""Persistent exact-match cache of LLM responses."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from contextlib import closing
+from pathlib import Path
+
+from swe_play.utils.llm_client import LLMClient
+
+# Default location of the cache database, can be overridden with SWE_PLAY_LLM_CACHE
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "swe_play" / "llm_cache.sqlite"
+
+
+class LLMCache:
+    """SQLite-backed cache of LLM responses keyed by a hash of the request."""
+
+    def __init__(self, path: str | os.PathLike[str] | None = None):
+        """Initialize the cache.
+
+        Args:
+            path: Path to the SQLite database. If None, will try to get from
+                SWE_PLAY_LLM_CACHE env var, then use the default location.
+        """
+        self.path = Path(path or os.getenv("SWE_PLAY_LLM_CACHE") or DEFAULT_CACHE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+        # One lock per key, so concurrent identical requests result in a single upstream call
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str, ttl: float | None = None) -> str | None:
+        """Get a cached response.
+
+        Args:
+            key: The cache key.
+            ttl: Maximum age of the entry in seconds. If None, entries never expire.
+
+        Returns:
+            The cached response, or None if it is missing or expired.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (ttl is not None and time.time() - row[1] > ttl):
+            return None
+        return str(row[0])
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response in the cache.
+
+        Args:
+            key: The cache key.
+            value: The response to store.
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+
+    def get_or_set(self, key: str, fetch: Callable[[], str], ttl: float | None = None) -> str:
+        """Get a cached response, calling `fetch` and storing its result on a miss.
+
+        Concurrent calls with the same key wait for the first one instead of calling
+        `fetch` again.
+
+        Args:
+            key: The cache key.
+            fetch: Function producing the response on a cache miss.
+            ttl: Maximum age of the entry in seconds. If None, entries never expire.
+
+        Returns:
+            The cached or freshly fetched response.
+        """
+        value = self.get(key, ttl)
+        if value is not None:
+            return value
+
+        with self._lock_for(key):
+            # Another thread may have filled the entry while we were waiting
+            value = self.get(key, ttl)
+            if value is None:
+                value = fetch()
+                self.set(key, value)
+        return value
+
+
+def make_cache_key(model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+    """Build the cache key of a completion request.
+
+    Args:
+        model: The model of the request.
+        system_prompt: The system prompt of the request.
+        user_prompt: The user prompt of the request.
+        temperature: The sampling temperature of the request.
+
+    Returns:
+        The SHA256 hex digest of the request.
+    """
+    payload = {"model": model, "sys": system_prompt, "user": user_prompt, "temp": temperature}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+# The shared cache, created on first use by get_llm_cache
+_llm_cache: LLMCache | None = None
+
+# Guards the creation of the shared cache, so concurrent first calls share its key locks
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the LLM response cache at the default location, shared across the process.
+
+    Returns:
+        The shared LLMCache instance.
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMCache()
+    return _llm_cache
+
+
+def cached_system_completion(
+    llm_client: LLMClient,
+    system_prompt: str,
+    user_prompt: str,
+    temperature: float = 0.7,
+    use_cache: bool = True,
+    cache_prefix: str | None = None,
+) -> str:
+    """Make a system completion request, reusing the response of an identical earlier request.
+
+    Setting the SWE_PLAY_NO_LLM_CACHE env var to 1 disables the cache regardless of
+    `use_cache`.
+
+    Args:
+        llm_client: The client used on a cache miss.
+        system_prompt: The system prompt to set the context.
+        user_prompt: The user prompt to send to the model.
+        temperature: Controls randomness in the response (0.0 to 2.0).
+        use_cache: Whether to use the cache. If False, the LLM is always called.
+        cache_prefix: Passed to `LLMClient.system_completion` for provider prompt caching.
+
+    Returns:
+        The generated text response.
+    """
+
+    def fetch() -> str:
+        return llm_client.system_completion(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            cache_prefix=cache_prefix,
+        )
+
+    if not use_cache or os.getenv("SWE_PLAY_NO_LLM_CACHE") == "1":
+        return fetch()
+
+    key = make_cache_key(llm_client.model, system_prompt, user_prompt, temperature)
+    return get_llm_cache().get_or_set(key, fetch)
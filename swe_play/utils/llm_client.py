@@ -1,6 +1,9 @@
 """LLM client utility for making calls to LLMs compatible with the OpenAI's API."""
 
+import functools
+import json
 import os
+import time
 from typing import Any, cast
 
 from openai import OpenAI
@@ -102,6 +105,7 @@ class LLMClient:
         user_prompt: str,
         temperature: float = 0.7,
         max_tokens: int | None = None,
+        cache_prefix: str | None = None,
         **kwargs: Any,
     ) -> str:
         """Make a completion request with a system message and user message.
@@ -111,20 +115,168 @@ class LLMClient:
             user_prompt: The user prompt to send to the model.
             temperature: Controls randomness in the response (0.0 to 2.0).
             max_tokens: Maximum number of tokens to generate.
+            cache_prefix: Leading part of the user prompt that is shared with other requests.
+                If given and the model is a Claude model, the system prompt and this prefix
+                are marked with Anthropic's `cache_control`, so that requests sharing them
+                reuse the cached prefix. Other models get plain string messages.
             **kwargs: Additional arguments to pass to the OpenAI API.
 
         Returns:
             The generated text response.
+
+        Raises:
+            ValueError: If `cache_prefix` is not a prefix of `user_prompt`.
+        """
+        if cache_prefix is not None and not user_prompt.startswith(cache_prefix):
+            raise ValueError("cache_prefix must be a prefix of user_prompt")
+
+        # cache_control blocks are specific to Anthropic, like the prefill of continue_completion
+        if cache_prefix is None or "claude" not in self.model.lower():
+            messages = cast(
+                list[ChatCompletionMessageParam],
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+            )
+            return self.chat_completion(messages, temperature, max_tokens, **kwargs)
+
+        # Static content goes first, so the cached prefix ends at the last cache_control mark
+        cache_control = {"type": "ephemeral"}
+        user_content = [{"type": "text", "text": cache_prefix, "cache_control": cache_control}]
+        if len(user_prompt) > len(cache_prefix):
+            user_content.append({"type": "text", "text": user_prompt[len(cache_prefix) :]})
+        messages = cast(
+            list[ChatCompletionMessageParam],
+            [
+                {
+                    "role": "system",
+                    "content": [
+                        {"type": "text", "text": system_prompt, "cache_control": cache_control}
+                    ],
+                },
+                {"role": "user", "content": user_content},
+            ],
+        )
+        return self.chat_completion(messages, temperature, max_tokens, **kwargs)
+
+    def continue_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        partial_response: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        **kwargs: Any,
+    ) -> str:
+        """Continue a truncated response by prefilling it as the assistant message.
+
+        Models supporting prefill (e.g. Claude) resume generating right where the partial
+        response ends, instead of answering it as a new prompt.
+
+        Args:
+            system_prompt: The system prompt of the original request.
+            user_prompt: The user prompt of the original request.
+            partial_response: The truncated response. Trailing whitespace is not allowed in
+                a prefill, so it is stripped.
+            temperature: Controls randomness in the response (0.0 to 2.0).
+            max_tokens: Maximum number of tokens to generate.
+            **kwargs: Additional arguments to pass to the OpenAI API.
+
+        Returns:
+            The generated continuation, without the partial response.
         """
         messages = cast(
             list[ChatCompletionMessageParam],
             [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
+                {"role": "assistant", "content": partial_response.rstrip()},
             ],
         )
         return self.chat_completion(messages, temperature, max_tokens, **kwargs)
 
+    def batch_system_completion(
+        self,
+        prompts: list[tuple[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        poll_interval: float = 30.0,
+    ) -> list[str]:
+        """Make several system completion requests through the Batch API.
+
+        The requests are generated in parallel on the provider side and billed at a discount,
+        but the batch may take up to 24 hours to complete.
+
+        Args:
+            prompts: List of (system_prompt, user_prompt) pairs, one per request.
+            temperature: Controls randomness in the responses (0.0 to 2.0).
+            max_tokens: Maximum number of tokens to generate per response.
+            poll_interval: Seconds to wait between checks of the batch status.
+
+        Returns:
+            The generated text responses, in the same order as `prompts`.
+
+        Raises:
+            Exception: If the batch fails or any of its requests has no response.
+        """
+        lines = []
+        for i, (system_prompt, user_prompt) in enumerate(prompts):
+            body: dict[str, Any] = {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                "temperature": temperature,
+            }
+            if max_tokens is not None:
+                body["max_tokens"] = max_tokens
+            lines.append(
+                json.dumps(
+                    {
+                        "custom_id": str(i),
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": body,
+                    }
+                )
+            )
+
+        try:
+            batch_file = self.client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode()), purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                time.sleep(poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+
+            if batch.status != "completed" or batch.output_file_id is None:
+                raise Exception(f"Batch {batch.id} ended with status {batch.status}")
+            output = self.client.files.content(batch.output_file_id).text
+
+        except Exception as e:
+            raise Exception(f"OpenAI batch API call failed: {str(e)}")
+
+        responses: list[str | None] = [None] * len(prompts)
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            choices = ((result.get("response") or {}).get("body") or {}).get("choices")
+            if choices:
+                responses[int(result["custom_id"])] = choices[0]["message"]["content"] or ""
+
+        missing = [str(i) for i, response in enumerate(responses) if response is None]
+        if missing:
+            raise Exception(f"No response choices received for batch requests {missing}")
+        return [response or "" for response in responses]
+
 
 def create_llm_client(
     api_key: str | None = None,
@@ -143,3 +295,19 @@ def create_llm_client(
         A configured LLMClient instance.
     """
     return LLMClient(api_key=api_key, model=model, base_url=base_url)
+
+
+@functools.cache
+def get_llm_client(model: str = "neulab/claude-sonnet-4-20250514") -> LLMClient:
+    """Get an LLM client for the model, shared across the process.
+
+    The client reads its credentials from the environment, and reusing it keeps the HTTP
+    connection pool warm across calls.
+
+    Args:
+        model: The model to use for completions.
+
+    Returns:
+        The shared LLMClient instance of the model.
+    """
+    return create_llm_client(model=model)
@@ -1,10 +1,14 @@
 """Prompt template retriever for Jinja templates."""
 
+import functools
 from pathlib import Path
 from typing import Any
 
 from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template, TemplateNotFound
 
+# Default prompts folder, relative to this module
+DEFAULT_PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
 
 class PromptRetriever:
     """Retrieves and resolves Jinja prompt templates from the prompts folder."""
@@ -16,12 +20,7 @@ class PromptRetriever:
             prompts_dir: Path to the prompts directory. If None, uses default location
                         relative to this module.
         """
-        if prompts_dir is None:
-            # Default to prompts folder relative to this module
-            current_dir = Path(__file__).parent
-            prompts_dir = current_dir.parent / "prompts"
-
-        self.prompts_dir = Path(prompts_dir)
+        self.prompts_dir = Path(prompts_dir) if prompts_dir is not None else DEFAULT_PROMPTS_DIR
 
         if not self.prompts_dir.exists():
             raise FileNotFoundError(f"Prompts directory not found: {self.prompts_dir}")
@@ -33,6 +32,7 @@ class PromptRetriever:
             trim_blocks=True,
             lstrip_blocks=True,
             undefined=StrictUndefined,  # Raise error on undefined variables
+            auto_reload=False,  # Prompts do not change at runtime, skip stat calls on includes
         )
 
         # Cache for loaded templates
@@ -148,6 +148,18 @@ class PromptRetriever:
         return prompts
 
 
+@functools.cache
+def get_prompt_retriever() -> PromptRetriever:
+    """Get the prompt retriever of the default prompts folder, shared across the process.
+
+    Reusing one retriever means every template is loaded and compiled only once.
+
+    Returns:
+        The shared PromptRetriever instance.
+    """
+    return PromptRetriever()
+
+
 # Convenience function for quick access
 def get_prompt(prompt_name: str, **variables: Any) -> str:
     """Quick function to get a prompt string by name.
@@ -159,5 +171,4 @@ def get_prompt(prompt_name: str, **variables: Any) -> str:
     Returns:
         Rendered prompt string.
     """
-    retriever = PromptRetriever()
-    return retriever.get_prompt(prompt_name, **variables)
+    return get_prompt_retriever().get_prompt(prompt_name, **variables)
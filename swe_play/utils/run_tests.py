@@ -0,0 +1,60 @@
+"""Utility for running the unit tests of a project."""
+
+import os
+import signal
+import subprocess
+from typing import IO, Any
+
+# Seconds a unit test script or file may run before it is counted as failed
+UNIT_TEST_TIMEOUT = 1200
+
+# Number of trailing bytes of the output of a failed unit test that are printed
+TEST_OUTPUT_TAIL_BYTES = 4000
+
+
+def run_test_command(
+    cmd: list[str],
+    cwd: str | os.PathLike[str],
+    stdout: int | IO[Any] = subprocess.DEVNULL,
+    stderr: int | IO[Any] = subprocess.DEVNULL,
+) -> int | None:
+    """Run a unit test command, killing it with all its subprocesses if it times out.
+
+    The command runs in its own process group, so a test runner started by a test script is
+    killed along with it, instead of writing into a project directory that is being removed.
+
+    Args:
+        cmd: The command to run.
+        cwd: The directory to run the command in.
+        stdout: Where to send the standard output, discarded by default.
+        stderr: Where to send the standard error, discarded by default.
+
+    Returns:
+        The exit status of the command, or None if it ran longer than UNIT_TEST_TIMEOUT.
+    """
+    with subprocess.Popen(
+        cmd, cwd=cwd, stdout=stdout, stderr=stderr, start_new_session=True
+    ) as process:
+        try:
+            return process.wait(timeout=UNIT_TEST_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                # The whole group exited right after the timeout
+                pass
+            process.wait()
+            return None
+
+
+def read_output_tail(file: IO[bytes]) -> str:
+    """Read the last TEST_OUTPUT_TAIL_BYTES of a file a unit test command wrote its output to.
+
+    Args:
+        file: The file passed as `stdout` or `stderr` to `run_test_command`.
+
+    Returns:
+        The decoded tail of the output.
+    """
+    file.seek(max(os.fstat(file.fileno()).st_size - TEST_OUTPUT_TAIL_BYTES, 0))
+    return file.read().decode("utf-8", errors="replace")
@@ -0,0 +1,84 @@
+"""Utility for loading the tasks of a project."""
+
+import re
+from typing import Any
+
+# Matches the characters of a task title that are not word characters, whitespace or dashes
+TITLE_STRIP_PATTERN = re.compile(r"[^\w\s-]")
+
+# Matches the runs of dashes and whitespace of a task title, which become underscores
+TITLE_JOIN_PATTERN = re.compile(r"[-\s]+")
+
+# Deletes the ASCII characters matched by TITLE_STRIP_PATTERN
+TITLE_DELETE_TABLE = str.maketrans(
+    "", "", "".join(c for c in map(chr, range(128)) if TITLE_STRIP_PATTERN.match(c))
+)
+
+
+def build_unit_tests_index(task: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Group the unit tests of a project by task number.
+
+    Tasks without any code or visual tests are left out.
+
+    Args:
+        task: The parsed content of the project's tasks.json.
+
+    Returns:
+        A dictionary keyed by task number, in task order. Each value holds the task's number,
+        title, description, phase and module numbers, its code and visual tests as
+        `{"type", "name", "description"}` dictionaries under `all_tests`, and their count
+        under `total_tests`.
+    """
+    unit_tests_by_task = {}  # Dictionary to group tests by task number
+
+    for phase in task["phases"]:
+        for module in phase.get("modules", []):
+            for task_item in module.get("tasks", []):
+                task_number = task_item.get("task_number")
+                unit_tests = task_item.get("unit_tests", {})
+                code_tests = unit_tests.get("code_tests", [])
+                visual_tests = unit_tests.get("visual_tests", [])
+
+                # Only process tasks that have actual tests
+                if code_tests or visual_tests:
+                    # Combine all tests for this task X.Y.Z
+                    all_tests_for_task = [
+                        {
+                            "type": test_type,
+                            "name": test.get("name"),
+                            "description": test.get("description"),
+                        }
+                        for test_type, tests in (("code", code_tests), ("visual", visual_tests))
+                        for test in tests
+                    ]
+
+                    unit_tests_by_task[task_number] = {
+                        "task_number": task_number,
+                        "task_title": task_item.get("title"),
+                        "task_description": task_item.get("description"),
+                        "phase_number": phase.get("phase_number"),
+                        "module_number": module.get("module_number"),
+                        "all_tests": all_tests_for_task,
+                        "total_tests": len(all_tests_for_task),
+                    }
+
+    return unit_tests_by_task
+
+
+def clean_task_title(task_title: str) -> str:
+    """Turn a task title into a name usable in file names.
+
+    Special characters are dropped, and runs of whitespace and dashes become underscores.
+
+    Args:
+        task_title: The title of the task.
+
+    Returns:
+        The lowercase cleaned title.
+    """
+    # Pure ASCII titles, the common case, are cleaned with a translation table instead of a regex
+    if task_title.isascii():
+        clean_title = task_title.translate(TITLE_DELETE_TABLE).strip()
+    else:
+        clean_title = TITLE_STRIP_PATTERN.sub("", task_title).strip()
+    return TITLE_JOIN_PATTERN.sub("_", clean_title).lower()